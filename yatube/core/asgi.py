@@ -0,0 +1,217 @@
+"""ASGI-точка входа для Django 2.2.
+
+В Django 2.2 нет ни ASGI-обработчика, ни асинхронных view, поэтому
+``ASGIHandler`` принимает соединения в цикле событий, а сам запрос
+(middleware, view, ORM) выполняет обычным WSGI-обработчиком Django в
+ограниченном пуле потоков. Медленный клиент, отправляющий тело запроса,
+занимает только цикл событий, а не рабочий поток.
+
+Ответ передаётся из потока в цикл событий по частям через очередь не
+больше ``RESPONSE_QUEUE_SIZE`` частей: обычная страница целиком
+помещается в очередь и не держит поток, а большой файл (``FileResponse``
+статики и медиа) не копится в памяти — поток ждёт, пока клиент прочитает
+уже отправленное.
+"""
+import asyncio
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+RESPONSE_CHUNK_SIZE = 64 * 1024
+RESPONSE_QUEUE_SIZE = 4
+
+
+def build_environ(scope, body):
+    """WSGI-окружение для HTTP-запроса ASGI."""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('127.0.0.1', 0)
+    script_name = scope.get('root_path', '')
+    path = scope['path']
+    if script_name and path.startswith(script_name):
+        path = path[len(script_name):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # Как в WSGI: декодированный путь байтами UTF-8 в строке latin-1
+        'SCRIPT_NAME': script_name.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = 'HTTP_' + name
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+def start_message(response):
+    return {
+        'type': 'http.response.start',
+        'status': response['status'],
+        'headers': response['headers'],
+    }
+
+
+class ResponseAborted(Exception):
+    """Цикл событий перестал принимать ответ (клиент отключился)."""
+
+
+class ResponseChannel:
+    """Очередь сообщений ответа из рабочего потока в цикл событий."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.window = threading.Semaphore(RESPONSE_QUEUE_SIZE)
+        self.closed = False
+
+    def put(self, message):
+        """Передаёт сообщение; ждёт, если очередь полна (рабочий поток)."""
+        self.window.acquire()
+        if self.closed:
+            raise ResponseAborted
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, message)
+
+    def finish(self):
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, None)
+
+    async def get(self):
+        """Следующее сообщение или ``None``, когда ответ закончился."""
+        message = await self.queue.get()
+        if message is not None:
+            self.window.release()
+        return message
+
+    def close(self):
+        self.closed = True
+        # Будит поток, если он ждёт места в очереди
+        self.window.release()
+
+
+class ASGIHandler:
+    """Обслуживает Django-приложение по протоколу ASGI (HTTP и lifespan)."""
+
+    def __init__(self, wsgi_application=None, executor=None):
+        self.wsgi_application = wsgi_application or get_wsgi_application()
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=settings.ASGI_THREADS, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(
+                f'Неподдерживаемый тип соединения {scope["type"]}'
+            )
+        body = await self.read_body(receive)
+        loop = asyncio.get_event_loop()
+        channel = ResponseChannel(loop)
+        future = loop.run_in_executor(
+            self.executor, self.run_wsgi, scope, body, channel
+        )
+        try:
+            while True:
+                message = await channel.get()
+                if message is None:
+                    break
+                await send(message)
+        finally:
+            channel.close()
+            try:
+                await future
+            finally:
+                body.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Читает тело запроса; большое тело уходит во временный файл."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def run_wsgi(self, scope, body, channel):
+        """Выполняет запрос в рабочем потоке и передаёт ответ по частям."""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        try:
+            result = self.wsgi_application(build_environ(scope, body),
+                                           start_response)
+            try:
+                # Приложение-генератор вызывает start_response только при
+                # первой итерации, поэтому заголовки уходят с первой частью
+                started = False
+                buffer = b''
+                for data in result:
+                    if not started:
+                        channel.put(start_message(response))
+                        started = True
+                    buffer += data
+                    if len(buffer) >= RESPONSE_CHUNK_SIZE:
+                        channel.put({
+                            'type': 'http.response.body',
+                            'body': buffer,
+                            'more_body': True,
+                        })
+                        buffer = b''
+                if not started:
+                    channel.put(start_message(response))
+                channel.put({'type': 'http.response.body', 'body': buffer})
+            except ResponseAborted:
+                pass
+            finally:
+                # Закрытие ответа отправляет request_finished, и Django
+                # освобождает соединения с БД этого потока
+                if hasattr(result, 'close'):
+                    result.close()
+        finally:
+            channel.finish()
+
+
+def get_asgi_application():
+    return ASGIHandler(get_wsgi_application())
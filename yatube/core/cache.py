@@ -0,0 +1,165 @@
+"""Кеширование страниц по поколениям.
+
+Страница хранится в кеше под ключом текущего поколения. Сигналы об
+изменении данных вызывают ``bump_generation``, и следующий запрос
+строит страницу заново; срок ``PAGE_CACHE_TIMEOUT`` только не даёт
+копиться страницам, которые больше никто не запросит.
+
+Ключ страницы строится из пути и только тех параметров запроса, от
+которых зависит view (``query_params``): случайные ``?x=`` не создают
+новых записей.
+
+Страницу нового поколения строит только один запрос (single-flight):
+он берёт блокировку через ``cache.add``, а остальные тем временем
+получают последнюю построенную версию страницы (stale-while-revalidate)
+или, если её нет, недолго ждут готовую.
+"""
+import datetime
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+from . import metrics
+from .db_routers import is_pinned, replica_cache_timeout
+
+metrics.describe('page_cache_hits', 'Страницы, отданные из кеша')
+metrics.describe(
+    'page_cache_stale', 'Устаревшие страницы, отданные во время перестроения'
+)
+metrics.describe(
+    'page_cache_waits', 'Запросы, дождавшиеся страницы другого запроса'
+)
+metrics.describe('page_cache_renders', 'Построения страниц при промахе кеша')
+
+WAIT_INTERVAL = 0.05
+# Параметры запроса, от которых зависят страницы лент
+PAGE_QUERY_PARAMS = ('page', 'cursor', 'q')
+
+
+def _generation_key(name):
+    return f'generation:{name}'
+
+
+def _new_generation():
+    # Время смены в начале значения даёт Last-Modified без запроса к БД
+    return f'{int(time.time() * 1000)}.{uuid.uuid4().hex}'
+
+
+def get_generation(name):
+    key = _generation_key(name)
+    generation = cache.get(key)
+    if generation is None:
+        generation = _new_generation()
+        if not cache.add(key, generation, None):
+            generation = cache.get(key, generation)
+    return generation
+
+
+def bump_generation(name):
+    cache.set(_generation_key(name), _new_generation(), None)
+
+
+def generation_time(generation):
+    """Когда началось поколение ``generation``; None, если неизвестно."""
+    milliseconds, dot, _ = generation.partition('.')
+    if not dot or not milliseconds.isdigit():
+        return None
+    return datetime.datetime.fromtimestamp(
+        int(milliseconds) / 1000, tz=datetime.timezone.utc
+    )
+
+
+def page_cache_key(request, key_prefix, generation,
+                   query_params=PAGE_QUERY_PARAMS):
+    query = urlencode([
+        (name, value)
+        for name in query_params
+        for value in request.GET.getlist(name)
+    ])
+    path = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    user_id = request.user.pk or 0
+    return f'{key_prefix}:{generation}:{user_id}:{path}'
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def single_flight(key, stale_key, render, allow_stale=True):
+    """Строит значение ``key`` не более чем в одном запросе сразу.
+
+    Запрос, взявший блокировку, вызывает ``render`` и сохраняет ответ под
+    ``key`` и под ``stale_key``. Остальные запросы отдают ответ из
+    ``stale_key`` (если ``allow_stale``), а иначе ждут до
+    ``SINGLE_FLIGHT_WAIT`` секунд и после этого строят ответ сами.
+    """
+    lock_key = f'lock:{key}'
+    token = uuid.uuid4().hex
+    if cache.add(lock_key, token, settings.SINGLE_FLIGHT_LOCK_TIMEOUT):
+        try:
+            metrics.incr('page_cache_renders')
+            response = render()
+            if _cacheable(response):
+                cache.set(key, response, replica_cache_timeout(
+                    settings.PAGE_CACHE_TIMEOUT
+                ))
+                cache.set(
+                    stale_key, response, settings.PAGE_CACHE_STALE_TIMEOUT
+                )
+            return response
+        finally:
+            # Если построение заняло больше SINGLE_FLIGHT_LOCK_TIMEOUT,
+            # блокировка уже может принадлежать другому запросу
+            if cache.get(lock_key) == token:
+                cache.delete(lock_key)
+    response = cache.get(stale_key) if allow_stale else None
+    if response is not None:
+        metrics.incr('page_cache_stale')
+        return response
+    deadline = time.monotonic() + settings.SINGLE_FLIGHT_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(WAIT_INTERVAL)
+        response = cache.get(key)
+        if response is not None:
+            metrics.incr('page_cache_waits')
+            return response
+        if cache.get(lock_key) is None:
+            # Запрос с блокировкой завершился, не сохранив страницу
+            break
+    metrics.incr('page_cache_renders')
+    return render()
+
+
+def cache_page_by_generation(generation, key_prefix,
+                             query_params=PAGE_QUERY_PARAMS):
+    """Кеширует ответ view, пока не сменится поколение ``generation``.
+
+    Страница зависит от пользователя (шапка, переключатель лент), поэтому
+    ключ включает его id, а из строки запроса — только ``query_params``.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            key = page_cache_key(
+                request, key_prefix, get_generation(generation), query_params
+            )
+            response = cache.get(key)
+            if response is not None:
+                metrics.incr('page_cache_hits')
+                return response
+            return single_flight(
+                key,
+                page_cache_key(request, key_prefix, 'latest', query_params),
+                lambda: view_func(request, *args, **kwargs),
+                # Только что писавший пользователь должен увидеть запись
+                allow_stale=not is_pinned(),
+            )
+        return _wrapped_view
+    return decorator
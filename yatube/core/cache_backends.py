@@ -0,0 +1,324 @@
+"""Двухуровневый кеш: память процесса перед общим кешем.
+
+``TwoTierCache`` держит небольшой LRU-кеш в памяти каждого процесса
+перед общим кешем (``OPTIONS['SHARED']`` — имя другого кеша из
+``CACHES``, например ``FileBasedCache`` или Redis). Чтение сначала идёт
+в память процесса, запись — сразу в оба уровня.
+
+Чтобы процессы не отдавали устаревшие значения, каждая запись и
+удаление дописывают ключ в журнал — файл, общий для процессов на
+машине. Процессы раз в ``JOURNAL_POLL`` секунд дочитывают журнал и
+выбрасывают из памяти изменённые другими ключи.
+
+Для префиксов ключей в ``OPTIONS['PREFIXES']`` задаются свои сроки
+хранения и ограничения::
+
+    'PREFIXES': {
+        'post_card:': {'timeout': 86400, 'local_timeout': 300},
+        'index_page:': {'max_size': 512 * 1024},
+        'paginator_count:': {'local': False},
+    }
+
+``timeout`` — срок в общем кеше, когда вызывающий код не указал свой;
+``local_timeout`` — срок в памяти процесса; ``max_size`` — наибольший
+размер значения в байтах, которое хранится в памяти процесса;
+``local: False`` — хранить только в общем кеше.
+
+Значения, которые могут попасть в память процесса, лежат в общем кеше
+вместе с моментом истечения (``SharedEntry``). Прочитавший их процесс
+держит значение в памяти не дольше, чем оно живёт в общем кеше, поэтому
+короткие сроки соблюдаются во всех процессах. ``incr`` для таких ключей
+не атомарен; счётчики лучше держать под префиксом с ``local: False``.
+"""
+import os
+import pickle
+import threading
+import time
+import uuid
+from collections import OrderedDict, namedtuple
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+metrics.describe('cache_local_hits', 'Попадания в кеш памяти процесса')
+metrics.describe('cache_shared_hits', 'Попадания в общий кеш')
+metrics.describe('cache_misses', 'Промахи двухуровневого кеша')
+
+_MISSING = object()
+CLEAR_MARKER = '*'
+
+# Значение в общем кеше и момент истечения по time.time() (None — вечно)
+SharedEntry = namedtuple('SharedEntry', 'value expires')
+
+
+class TwoTierCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options['SHARED']
+        self._local_max_entries = options.get('LOCAL_MAX_ENTRIES', 1000)
+        self._local_timeout = options.get('LOCAL_TIMEOUT', 60)
+        self._prefixes = sorted(
+            options.get('PREFIXES', {}).items(),
+            key=lambda item: len(item[0]),
+            reverse=True,
+        )
+        self._journal = options.get('JOURNAL')
+        self._journal_poll = options.get('JOURNAL_POLL', 0.1)
+        self._journal_max_bytes = options.get(
+            'JOURNAL_MAX_BYTES', 1024 * 1024
+        )
+        self._token = uuid.uuid4().hex
+        self._local = OrderedDict()
+        self._lock = threading.RLock()
+        self._next_poll = 0
+        self._journal_inode = None
+        self._journal_offset = 0
+        if self._journal:
+            os.makedirs(os.path.dirname(self._journal), exist_ok=True)
+            self._open_journal()
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    # Настройки префиксов
+
+    def _policy(self, key):
+        for prefix, policy in self._prefixes:
+            if key.startswith(prefix):
+                return policy
+        return {}
+
+    def _shared_timeout(self, key, timeout):
+        if timeout is DEFAULT_TIMEOUT:
+            return self._policy(key).get('timeout', DEFAULT_TIMEOUT)
+        return timeout
+
+    def _to_shared(self, key, value, timeout):
+        if not self._policy(key).get('local', True):
+            return value
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        expires = None if timeout is None else time.time() + timeout
+        return SharedEntry(value, expires)
+
+    def _from_shared(self, value):
+        """Значение из общего кеша и сколько его можно держать в памяти.
+
+        Срок ``0`` — не держать: он истёк или неизвестен (значение
+        записано в общий кеш в обход ``TwoTierCache``).
+        """
+        if not isinstance(value, SharedEntry):
+            return value, 0
+        if value.expires is None:
+            return value.value, None
+        return value.value, max(value.expires - time.time(), 0)
+
+    def _local_expiry(self, key, timeout):
+        local_timeout = self._policy(key).get(
+            'local_timeout', self._local_timeout
+        )
+        if timeout is not DEFAULT_TIMEOUT and timeout is not None:
+            local_timeout = min(local_timeout, timeout)
+        return time.monotonic() + local_timeout
+
+    # Уровень процесса
+
+    def _store_local(self, key, value, timeout=DEFAULT_TIMEOUT):
+        policy = self._policy(key)
+        if not policy.get('local', True) or timeout == 0:
+            return
+        if timeout is DEFAULT_TIMEOUT:
+            timeout = self.shared.default_timeout
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(data) > policy.get('max_size', float('inf')):
+            return
+        made_key = self.make_key(key)
+        with self._lock:
+            self._local[made_key] = (self._local_expiry(key, timeout), data)
+            self._local.move_to_end(made_key)
+            while len(self._local) > self._local_max_entries:
+                self._local.popitem(last=False)
+
+    def _get_local(self, key):
+        made_key = self.make_key(key)
+        with self._lock:
+            entry = self._local.get(made_key)
+            if entry is None:
+                return _MISSING
+            expiry, data = entry
+            if expiry < time.monotonic():
+                del self._local[made_key]
+                return _MISSING
+            self._local.move_to_end(made_key)
+        return pickle.loads(data)
+
+    def _drop_local(self, made_key):
+        with self._lock:
+            if made_key == CLEAR_MARKER:
+                self._local.clear()
+            else:
+                self._local.pop(made_key, None)
+
+    # Журнал изменений
+
+    def _open_journal(self):
+        fd = os.open(self._journal, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            stat = os.fstat(fd)
+        finally:
+            os.close(fd)
+        self._journal_inode = stat.st_ino
+        self._journal_offset = stat.st_size
+
+    def _broadcast(self, made_key):
+        self._drop_local(made_key)
+        if not self._journal:
+            return
+        line = f'{self._token} {made_key}\n'.encode()
+        fd = os.open(self._journal, os.O_WRONLY | os.O_APPEND | os.O_CREAT)
+        try:
+            # Короткая запись в режиме O_APPEND не перемешивается с чужими
+            os.write(fd, line)
+            size = os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+        if size > self._journal_max_bytes:
+            # Журнал заменяется пустым файлом; процессы заметят смену
+            # файла и очистят свою память целиком
+            fresh = f'{self._journal}.{self._token}'
+            open(fresh, 'wb').close()
+            os.replace(fresh, self._journal)
+
+    def _poll(self):
+        if not self._journal or time.monotonic() < self._next_poll:
+            return
+        with self._lock:
+            self._next_poll = time.monotonic() + self._journal_poll
+            try:
+                stat = os.stat(self._journal)
+            except FileNotFoundError:
+                self._local.clear()
+                return
+            if (stat.st_ino != self._journal_inode
+                    or stat.st_size < self._journal_offset):
+                self._local.clear()
+                self._journal_inode = stat.st_ino
+                self._journal_offset = 0
+            if stat.st_size == self._journal_offset:
+                return
+            with open(self._journal, 'rb') as journal:
+                journal.seek(self._journal_offset)
+                data = journal.read()
+            data = data[:data.rfind(b'\n') + 1]
+            self._journal_offset += len(data)
+            for line in data.decode().splitlines():
+                token, _, made_key = line.partition(' ')
+                if token != self._token:
+                    self._drop_local(made_key)
+
+    # API кеша Django
+
+    def get(self, key, default=None, version=None):
+        self._poll()
+        value = self._get_local(key) if version is None else _MISSING
+        if value is not _MISSING:
+            metrics.incr('cache_local_hits')
+            return value
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            metrics.incr('cache_misses')
+            return default
+        metrics.incr('cache_shared_hits')
+        value, remaining = self._from_shared(value)
+        if version is None:
+            self._store_local(key, value, remaining)
+        return value
+
+    def get_many(self, keys, version=None):
+        self._poll()
+        found, missing = {}, []
+        for key in keys:
+            value = self._get_local(key) if version is None else _MISSING
+            if value is _MISSING:
+                missing.append(key)
+            else:
+                found[key] = value
+        metrics.incr('cache_local_hits', len(found))
+        if missing:
+            shared = self.shared.get_many(missing, version=version)
+            metrics.incr('cache_shared_hits', len(shared))
+            metrics.incr('cache_misses', len(missing) - len(shared))
+            for key, value in shared.items():
+                value, remaining = self._from_shared(value)
+                if version is None:
+                    self._store_local(key, value, remaining)
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._shared_timeout(key, timeout)
+        self.shared.set(
+            key, self._to_shared(key, value, timeout), timeout,
+            version=version,
+        )
+        self._broadcast(self.make_key(key, version))
+        if version is None:
+            self._store_local(key, value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        for key, value in data.items():
+            self.set(key, value, timeout, version=version)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        timeout = self._shared_timeout(key, timeout)
+        added = self.shared.add(
+            key, self._to_shared(key, value, timeout), timeout,
+            version=version,
+        )
+        if added:
+            self._broadcast(self.make_key(key, version))
+            if version is None:
+                self._store_local(key, value, timeout)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        if not self._policy(key).get('local', True):
+            timeout = self._shared_timeout(key, timeout)
+            return self.shared.touch(key, timeout, version=version)
+        # Новый срок должен попасть и в SharedEntry
+        value = self.shared.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return False
+        self.set(key, self._from_shared(value)[0], timeout, version=version)
+        return True
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._broadcast(self.make_key(key, version))
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
+    def has_key(self, key, version=None):
+        return self.get(key, _MISSING, version=version) is not _MISSING
+
+    def incr(self, key, delta=1, version=None):
+        if self._policy(key).get('local', True):
+            # В общем кеше лежит SharedEntry, а не число
+            return super().incr(key, delta, version=version)
+        value = self.shared.incr(key, delta, version=version)
+        self._broadcast(self.make_key(key, version))
+        return value
+
+    def clear(self):
+        self.shared.clear()
+        self._broadcast(CLEAR_MARKER)
+
+    def close(self, **kwargs):
+        self.shared.close(**kwargs)
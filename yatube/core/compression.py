@@ -0,0 +1,42 @@
+"""Сжатие ответов и статики: br (пакет Brotli из requirements.txt) и gzip.
+
+Без пакета brotli остаётся только gzip.
+
+Ответы сжимаются на лету быстрыми уровнями, а статика при
+``collectstatic`` — максимальными, один раз.
+"""
+import gzip
+import re
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения сжатых копий в порядке предпочтения
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+if brotli is None:
+    del SUFFIXES['br']
+
+_ACCEPT_ENCODING = re.compile(r'([\w*]+)\s*(?:;\s*q\s*=\s*([\d.]+))?')
+
+
+def accepted_encodings(request):
+    """Поддерживаемые клиентом и сервером сжатия, лучшие первыми."""
+    accepted = {}
+    header = request.META.get('HTTP_ACCEPT_ENCODING', '')
+    for coding, quality in _ACCEPT_ENCODING.findall(header.lower()):
+        try:
+            accepted[coding] = float(quality) if quality else 1
+        except ValueError:
+            continue
+    return [
+        encoding for encoding in SUFFIXES
+        if accepted.get(encoding, accepted.get('*', 0)) > 0
+    ]
+
+
+def compress(data, encoding, best=False):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
@@ -0,0 +1,81 @@
+"""Чтение лент с реплик базы данных.
+
+``ReplicaRouter`` отправляет чтение моделей из ``REPLICATED_MODELS`` на
+случайную реплику из ``DATABASE_REPLICAS``, а запись — на ``default``.
+Реплика отстаёт от основной базы, поэтому после записи чтение идёт с
+основной базы: до конца запроса, а ``ReplicaPinningMiddleware`` ещё и
+ставит cookie, которая держит чтение пользователя на ней
+``REPLICA_PIN_SECONDS`` секунд.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'read_primary'
+
+_state = threading.local()
+
+
+def pin_to_primary():
+    _state.pinned = True
+
+
+def is_pinned():
+    return getattr(_state, 'pinned', False)
+
+
+def reset():
+    _state.pinned = False
+    _state.wrote = False
+
+
+def wrote_in_request():
+    return getattr(_state, 'wrote', False)
+
+
+def replica_cache_timeout(timeout, using=None):
+    """Срок хранения в кеше данных, которые могли прийти с реплики.
+
+    Страница, собранная с отстающей реплики сразу после записи, иначе
+    осталась бы в кеше устаревшей до следующей смены поколения.
+    """
+    if using is None:
+        from_replica = bool(settings.DATABASE_REPLICAS) and not is_pinned()
+    else:
+        from_replica = using in settings.DATABASE_REPLICAS
+    if not from_replica:
+        return timeout
+    if timeout is None:
+        return settings.REPLICA_PIN_SECONDS
+    return min(timeout, settings.REPLICA_PIN_SECONDS)
+
+
+def _replicated(model):
+    return model._meta.label_lower in settings.REPLICATED_MODELS
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if not replicas or not _replicated(model) or is_pinned():
+            return DEFAULT_DB_ALIAS
+        # Внутри транзакции читаем то, что в ней же записали
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        if _replicated(model):
+            _state.wrote = True
+            pin_to_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return {obj1._state.db, obj2._state.db} <= databases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик повторяет основную базу при репликации
+        return db not in settings.DATABASE_REPLICAS
@@ -0,0 +1,176 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sqlite import apply_pragmas
+from posts.benchmark import percentile
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL, comments_count INTEGER DEFAULT 0)',
+    'CREATE INDEX post_author_feed_idx ON post (author_id, pub_date, id)',
+    'CREATE TABLE comment (id INTEGER PRIMARY KEY, post_id INTEGER, '
+    'text TEXT, created REAL)',
+)
+AUTHORS = 100
+KINDS = {'reads': 'чтение', 'writes': 'запись'}
+READ_SQL = (
+    'SELECT id, text, pub_date FROM post WHERE author_id = ? '
+    'ORDER BY pub_date DESC, id DESC LIMIT 10'
+)
+# Как add_comment: вставка и пересчёт счётчика в одной транзакции
+WRITE_SQL = (
+    'INSERT INTO comment (post_id, text, created) VALUES (?, ?, ?)',
+    'UPDATE post SET comments_count = comments_count + 1 WHERE id = ?',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite при одновременном чтении '
+        'и записи: настройки по умолчанию с соединением на каждый запрос '
+        'против SQLITE_PRAGMAS с постоянными соединениями'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--seconds', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument(
+            '--directory',
+            help='каталог для временной базы; по умолчанию системный',
+        )
+
+    def handle(self, *args, **options):
+        profiles = {
+            'по умолчанию': ({}, False),
+            'SQLITE_PRAGMAS': (settings.SQLITE_PRAGMAS, True),
+        }
+        results = {}
+        for name, (pragmas, persistent) in profiles.items():
+            with tempfile.TemporaryDirectory(
+                dir=options['directory']
+            ) as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.create_database(path, pragmas, options['posts'])
+                results[name] = self.run(path, pragmas, persistent, options)
+            self.report(name, results[name], options['seconds'])
+        before, after = results.values()
+        for kind, label in KINDS.items():
+            if before[kind]:
+                self.stdout.write(
+                    f'{label}: x{len(after[kind]) / len(before[kind]):.1f}'
+                )
+
+    def connect(self, path, pragmas):
+        # Как Django: автокоммит и ожидание блокировки до 5 секунд
+        connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+        apply_pragmas(connection, pragmas)
+        return connection
+
+    def create_database(self, path, pragmas, posts):
+        connection = self.connect(path, pragmas)
+        try:
+            for statement in SCHEMA:
+                connection.execute(statement)
+            connection.execute('BEGIN')
+            connection.executemany(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)',
+                (
+                    (number % AUTHORS, 'Текст поста ' * 20, number)
+                    for number in range(posts)
+                ),
+            )
+            connection.execute('COMMIT')
+        finally:
+            connection.close()
+
+    def read(self, connection, options):
+        connection.execute(
+            READ_SQL, (random.randrange(AUTHORS),)
+        ).fetchall()
+
+    def write(self, connection, options):
+        post_id = random.randrange(1, options['posts'] + 1)
+        connection.execute('BEGIN')
+        try:
+            connection.execute(
+                WRITE_SQL[0], (post_id, 'Комментарий', time.time())
+            )
+            connection.execute(WRITE_SQL[1], (post_id,))
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def worker(self, operation, path, pragmas, persistent, options,
+               deadline):
+        """Выполняет операцию до ``deadline``: задержки и число ошибок."""
+        latencies, errors = [], 0
+        connection = self.connect(path, pragmas) if persistent else None
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            # CONN_MAX_AGE = 0: соединение на каждый запрос
+            current = connection or self.connect(path, pragmas)
+            try:
+                operation(current, options)
+            except sqlite3.OperationalError:
+                errors += 1
+                continue
+            else:
+                latencies.append(time.perf_counter() - started)
+            finally:
+                if current is not connection:
+                    current.close()
+        if connection is not None:
+            connection.close()
+        return latencies, errors
+
+    def run(self, path, pragmas, persistent, options):
+        """Задержки чтений и записей за ``--seconds`` и число ошибок."""
+        results = {'reads': [], 'writes': [], 'errors': 0}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+
+        def target(kind, operation):
+            latencies, errors = self.worker(
+                operation, path, pragmas, persistent, options, deadline
+            )
+            with lock:
+                results[kind].extend(latencies)
+                results['errors'] += errors
+
+        threads = [
+            threading.Thread(target=target, args=('reads', self.read))
+            for _ in range(options['readers'])
+        ] + [
+            threading.Thread(target=target, args=('writes', self.write))
+            for _ in range(options['writers'])
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def report(self, name, results, seconds):
+        self.stdout.write(self.style.MIGRATE_HEADING(name))
+        for kind, label in KINDS.items():
+            latencies = results[kind]
+            if not latencies:
+                self.stdout.write(f'{label}: 0')
+                continue
+            self.stdout.write(
+                f'{label}: {len(latencies) / seconds:.0f}/с, '
+                f'p50 {percentile(latencies, 50) * 1000:.2f} мс, '
+                f'p99 {percentile(latencies, 99) * 1000:.2f} мс'
+            )
+        self.stdout.write(f'ошибок: {results["errors"]}')
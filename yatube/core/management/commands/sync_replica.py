@@ -0,0 +1,35 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную SQLite-базу в файлы реплик; нужна для проверки '
+        'чтения с реплик локально'
+    )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены: задайте DATABASE_REPLICAS'
+            )
+        databases = [connections['default']] + [
+            connections[alias] for alias in settings.DATABASE_REPLICAS
+        ]
+        if any(db.vendor != 'sqlite' for db in databases):
+            raise CommandError('Команда работает только с SQLite')
+        source = sqlite3.connect(databases[0].settings_dict['NAME'])
+        try:
+            for replica in databases[1:]:
+                target = sqlite3.connect(replica.settings_dict['NAME'])
+                try:
+                    source.backup(target)
+                finally:
+                    target.close()
+                self.stdout.write(f'{replica.alias}: скопирована')
+        finally:
+            source.close()
+        self.stdout.write(self.style.SUCCESS('Реплики синхронизированы'))
@@ -0,0 +1,154 @@
+"""Счётчики и гистограммы процесса для мониторинга.
+
+Значения живут в памяти процесса и отдаются view ``core.views.metrics``
+в текстовом формате Prometheus. Метки (например, ``view``) передаются
+именованными аргументами ``incr`` и ``observe``.
+
+Внутри ``collect()`` счётчики и замеры ``timed()`` текущего потока ещё и
+копятся в ``RequestStats`` — так ``PerformanceMiddleware`` узнаёт, сколько
+попаданий в кеш и времени на шаблоны пришлось на один запрос.
+"""
+import bisect
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Границы корзин гистограмм в секундах, как в клиентах Prometheus
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+_histograms = defaultdict(dict)
+_buckets = {}
+_help = {}
+_request = threading.local()
+
+
+def describe(name, text, buckets=None):
+    _help[name] = text
+    if buckets is not None:
+        _buckets[name] = tuple(buckets)
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    pairs = ','.join(
+        f'{key}="{value}"' for key, value in sorted(labels.items())
+    )
+    return f'{name}{{{pairs}}}'
+
+
+def incr(name, value=1, **labels):
+    with _lock:
+        _counters[name, tuple(sorted(labels.items()))] += value
+    stats = getattr(_request, 'stats', None)
+    if stats is not None:
+        stats.counters[name] += value
+
+
+def observe(name, value, **labels):
+    """Добавляет значение в гистограмму ``name``."""
+    key = tuple(sorted(labels.items()))
+    buckets = _buckets.get(name, DEFAULT_BUCKETS)
+    with _lock:
+        series = _histograms[name].setdefault(key, {
+            'counts': [0] * len(buckets), 'sum': 0, 'count': 0,
+        })
+        index = bisect.bisect_left(buckets, value)
+        if index < len(series['counts']):
+            series['counts'][index] += 1
+        series['sum'] += value
+        series['count'] += 1
+
+
+def snapshot():
+    with _lock:
+        return {
+            _series(name, dict(labels)): value
+            for (name, labels), value in _counters.items()
+        }
+
+
+class RequestStats:
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.timings = defaultdict(float)
+        self._depth = defaultdict(int)
+
+
+@contextmanager
+def collect():
+    """Копит счётчики и замеры текущего потока в ``RequestStats``."""
+    stats = RequestStats()
+    _request.stats = stats
+    try:
+        yield stats
+    finally:
+        _request.stats = None
+
+
+@contextmanager
+def timed(name):
+    """Замеряет блок внутри ``collect()``; вложенные блоки не суммируются."""
+    stats = getattr(_request, 'stats', None)
+    if stats is None:
+        yield
+        return
+    stats._depth[name] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats._depth[name] -= 1
+        if not stats._depth[name]:
+            stats.timings[name] += time.perf_counter() - started
+
+
+def _render_histogram(lines, name, histogram):
+    buckets = _buckets.get(name, DEFAULT_BUCKETS)
+    for key, series in sorted(histogram.items()):
+        labels = dict(key)
+        cumulative = 0
+        for bound, count in zip(buckets, series['counts']):
+            cumulative += count
+            lines.append(
+                f'{_series(name + "_bucket", {**labels, "le": bound})} '
+                f'{cumulative}'
+            )
+        lines.append(
+            f'{_series(name + "_bucket", {**labels, "le": "+Inf"})} '
+            f'{series["count"]}'
+        )
+        lines.append(f'{_series(name + "_sum", labels)} {series["sum"]}')
+        lines.append(f'{_series(name + "_count", labels)} {series["count"]}')
+
+
+def render_prometheus():
+    lines = []
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = {
+            name: {
+                key: dict(series, counts=list(series['counts']))
+                for key, series in histogram.items()
+            }
+            for name, histogram in _histograms.items()
+        }
+    described = set()
+    for (name, labels), value in counters:
+        if name not in described:
+            described.add(name)
+            if name in _help:
+                lines.append(f'# HELP {name} {_help[name]}')
+            lines.append(f'# TYPE {name} counter')
+        lines.append(f'{_series(name, dict(labels))} {value}')
+    for name, histogram in sorted(histograms.items()):
+        if name in _help:
+            lines.append(f'# HELP {name} {_help[name]}')
+        lines.append(f'# TYPE {name} histogram')
+        _render_histogram(lines, name, histogram)
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,180 @@
+import logging
+import random
+import re
+import time
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import db_routers, metrics
+from .compression import accepted_encodings, compress
+from .query_budget import QueryBudgetExceeded, budget_of, count_queries
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+CACHE_HITS = ('cache_local_hits', 'cache_shared_hits')
+CACHE_MISSES = ('cache_misses',)
+
+metrics.describe(
+    'http_request_duration_seconds', 'Время обработки запроса по view'
+)
+metrics.describe(
+    'http_request_db_seconds', 'Время SQL-запросов (замеренные запросы)'
+)
+metrics.describe(
+    'http_request_queries', 'Число SQL-запросов (замеренные запросы)',
+    buckets=QUERY_BUCKETS,
+)
+metrics.describe(
+    'http_request_template_seconds',
+    'Время отрисовки шаблонов (замеренные запросы)',
+)
+metrics.describe(
+    'http_request_cache_hits', 'Попадания в кеш (замеренные запросы)'
+)
+metrics.describe(
+    'http_request_cache_misses', 'Промахи кеша (замеренные запросы)'
+)
+metrics.describe(
+    'http_response_saved_bytes', 'Байт сэкономлено сжатием ответов'
+)
+
+
+class QueryBudgetMiddleware:
+    """Проверяет, что view уложилась в объявленный бюджет запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with count_queries() as counter:
+            response = self.get_response(request)
+        budget = getattr(request, 'query_budget', None)
+        if budget is not None and counter.count > budget:
+            message = (
+                f'{request.path}: {counter.count} SQL-запросов '
+                f'при бюджете {budget}'
+            )
+            if settings.QUERY_BUDGET_STRICT:
+                raise QueryBudgetExceeded(message)
+            logger.warning(message)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = budget_of(view_func)
+
+
+class ReplicaPinningMiddleware:
+    """Направляет чтение на основную базу сразу после записи.
+
+    Запрос с cookie ``read_primary`` читает только с основной базы, а
+    запрос, который что-то записал, ставит эту cookie на
+    ``REPLICA_PIN_SECONDS`` секунд.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        db_routers.reset()
+        if request.COOKIES.get(db_routers.PIN_COOKIE):
+            db_routers.pin_to_primary()
+        try:
+            response = self.get_response(request)
+            if db_routers.wrote_in_request():
+                response.set_cookie(
+                    db_routers.PIN_COOKIE, '1',
+                    max_age=settings.REPLICA_PIN_SECONDS,
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            db_routers.reset()
+        return response
+
+
+class PerformanceMiddleware:
+    """Замеряет время, SQL-запросы, кеш и шаблоны каждого view.
+
+    Время ответа пишется в гистограмму для всех запросов, а подробный
+    замер (SQL, кеш, шаблоны) и заголовок ``Server-Timing`` — только для
+    доли ``PERFORMANCE_SAMPLE_RATE`` запросов, чтобы не замедлять
+    остальные.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            response = self.get_response(request)
+            metrics.observe(
+                'http_request_duration_seconds',
+                time.perf_counter() - started,
+                view=self.view_name(request),
+            )
+            return response
+        with metrics.collect() as stats, count_queries() as queries:
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+        view = self.view_name(request)
+        hits = sum(stats.counters[name] for name in CACHE_HITS)
+        misses = sum(stats.counters[name] for name in CACHE_MISSES)
+        template = stats.timings['template']
+        metrics.observe('http_request_duration_seconds', duration, view=view)
+        metrics.observe('http_request_db_seconds', queries.duration, view=view)
+        metrics.observe('http_request_queries', queries.count, view=view)
+        metrics.observe('http_request_template_seconds', template, view=view)
+        metrics.incr('http_request_cache_hits', hits, view=view)
+        metrics.incr('http_request_cache_misses', misses, view=view)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = ', '.join((
+                f'app;dur={duration * 1000:.1f}',
+                f'db;dur={queries.duration * 1000:.1f};'
+                f'desc="{queries.count} SQL"',
+                f'tpl;dur={template * 1000:.1f}',
+                f'cache;desc="{hits} hit {misses} miss"',
+            ))
+        return response
+
+    def view_name(self, request):
+        match = getattr(request, 'resolver_match', None)
+        return match.view_name if match else 'unresolved'
+
+
+class CompressionMiddleware:
+    """Сжимает HTML и JSON не короче ``COMPRESSION_MIN_SIZE`` байт.
+
+    Выбирает br или gzip по ``Accept-Encoding``; короткие ответы и
+    потоковые (файлы статики уже сжаты заранее) отдаются как есть.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';')[0]
+        if content_type not in settings.COMPRESSION_CONTENT_TYPES:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        encodings = accepted_encodings(request)
+        if not encodings:
+            return response
+        compressed = compress(response.content, encodings[0])
+        saved = len(response.content) - len(compressed)
+        if saved <= 0:
+            return response
+        metrics.incr('http_response_saved_bytes', saved, encoding=encodings[0])
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encodings[0]
+        # Сжатое тело отличается побайтно, поэтому ETag становится слабым
+        if response.has_header('ETag'):
+            response['ETag'] = re.sub('^(W/)?', 'W/', response['ETag'])
+        return response
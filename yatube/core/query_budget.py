@@ -0,0 +1,70 @@
+"""Бюджет SQL-запросов для view.
+
+View объявляет бюджет декоратором ``query_budget``, а
+``core.middleware.QueryBudgetMiddleware`` считает запросы за время
+обработки запроса. В тестах превышение — ошибка, в production —
+предупреждение в лог.
+"""
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+
+
+@contextmanager
+def count_queries():
+    """Считает запросы ко всем базам внутри блока ``with``."""
+    counter = QueryCounter()
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def query_budget(max_queries):
+    """Объявляет, сколько запросов к БД может сделать view.
+
+    ``max_queries`` — число или функция без аргументов, если бюджет
+    зависит от настроек.
+    """
+    def decorator(view_func):
+        view_func.query_budget = max_queries
+        return view_func
+    return decorator
+
+
+def budget_of(view_func):
+    """Бюджет view на текущий запрос или ``None``, если он не объявлен."""
+    budget = getattr(view_func, 'query_budget', None)
+    return budget() if callable(budget) else budget
+
+
+class QueryBudgetMixin:
+    """Примесь к ``TestCase`` с проверкой верхней границы запросов."""
+
+    @contextmanager
+    def assertMaxQueries(self, max_queries):
+        with count_queries() as counter:
+            yield counter
+        self.assertLessEqual(
+            counter.count, max_queries,
+            f'Выполнено {counter.count} запросов при бюджете {max_queries}'
+        )
@@ -0,0 +1,26 @@
+"""Настройка соединений SQLite для нагрузки.
+
+При каждом новом соединении с SQLite выполняются ``PRAGMA`` из
+``SQLITE_PRAGMAS``. Журнал WAL позволяет читать, пока идёт запись, а
+``synchronous=NORMAL`` в режиме WAL не теряет согласованность при сбое,
+только последние транзакции при отключении питания. Вместе с
+``CONN_MAX_AGE`` соединение и его настройки переиспользуются между
+запросами.
+"""
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    """Выполняет ``PRAGMA`` на соединении модуля ``sqlite3``."""
+    for name, value in pragmas.items():
+        dbapi_connection.execute(f'PRAGMA {name} = {value}')
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    # Напрямую через sqlite3: PRAGMA не попадают в счётчики запросов
+    apply_pragmas(connection.connection, settings.SQLITE_PRAGMAS)
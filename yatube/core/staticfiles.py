@@ -0,0 +1,49 @@
+"""Сборка статики с хешами в именах и заранее сжатыми копиями.
+
+``collectstatic`` с ``CompressedManifestStaticFilesStorage`` кладёт в
+``STATIC_ROOT`` файлы с хешем содержимого в имени (``{% static %}``
+ссылается на них через манифест), а рядом — ``.gz`` и ``.br`` копии
+текстовых файлов. ``core.views.serve_static`` отдаёт подходящую копию,
+а хешированным именам — заголовки для вечного кеша.
+"""
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+from .compression import SUFFIXES, compress
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.svg', '.ico', '.json', '.txt', '.map', '.xml', '.html',
+)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        hashed_names = {}
+        for name, hashed_name, processed in super().post_process(
+            paths, dry_run, **options
+        ):
+            if hashed_name and not isinstance(processed, Exception):
+                # Файлы со ссылками обрабатываются в несколько проходов;
+                # сжимается имя из последнего
+                hashed_names[name] = hashed_name
+            yield name, hashed_name, processed
+        if dry_run:
+            return
+        for hashed_name in hashed_names.values():
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self.compress_file(hashed_name)
+
+    def compress_file(self, name):
+        """Сохраняет сжатые копии, если они меньше исходного файла."""
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < settings.COMPRESSION_MIN_SIZE:
+            return
+        for encoding, suffix in SUFFIXES.items():
+            compressed = compress(data, encoding, best=True)
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
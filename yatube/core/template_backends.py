@@ -0,0 +1,120 @@
+"""Шаблонизатор Django с замером времени отрисовки.
+
+Время ``render`` шаблонов попадает в ``metrics.timed('template')``, то
+есть учитывается только в запросах, которые замеряет
+``PerformanceMiddleware``. Вложенные ``render_to_string`` (например,
+карточки постов) входят во время внешнего шаблона и не суммируются.
+
+``warm_up`` заранее компилирует шаблоны из ``DIRS`` в кеш загрузчика
+``cached.Loader``, а ``profile_renders`` замеряет время каждого шаблона
+с учётом ``include`` и ``extends`` (для команды ``profile_templates``).
+"""
+import logging
+import os
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.backends import django as django_backend
+from django.template.base import Template as CompiledTemplate
+from django.template.loaders.cached import Loader as CachedLoader
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+TEMPLATE_EXTENSIONS = ('.html', '.txt')
+
+
+class Template(django_backend.Template):
+    def render(self, context=None, request=None):
+        with metrics.timed('template'):
+            return super().render(context, request)
+
+
+class DjangoTemplates(django_backend.DjangoTemplates):
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django_backend.reraise(exc, self)
+
+
+def _template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(TEMPLATE_EXTENSIONS):
+                path = os.path.relpath(os.path.join(root, name), directory)
+                yield path.replace(os.sep, '/')
+
+
+def uses_cached_loader(engine):
+    return any(
+        isinstance(loader, CachedLoader) for loader in engine.template_loaders
+    )
+
+
+def warm_up():
+    """Компилирует шаблоны из ``DIRS`` в кеш загрузчиков.
+
+    Возвращает число шаблонов; без ``cached.Loader`` ничего не делает.
+    """
+    compiled = 0
+    for backend in engines.all():
+        if not isinstance(backend, DjangoTemplates):
+            continue
+        engine = backend.engine
+        if not uses_cached_loader(engine):
+            continue
+        for directory in engine.dirs:
+            for name in _template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Ошибка в шаблоне %s', name)
+                    continue
+                compiled += 1
+    return compiled
+
+
+class RenderStats:
+    def __init__(self):
+        self.renders = 0
+        self.total = 0
+        self.own = 0
+
+
+@contextmanager
+def profile_renders():
+    """Время отрисовки по шаблонам: общее и без вложенных шаблонов.
+
+    Подменяет ``Template._render`` на время блока, как это делает
+    тестовое окружение Django, поэтому годится только для команд.
+    """
+    stats = defaultdict(RenderStats)
+    stack = []
+    original = CompiledTemplate._render
+
+    def _render(template, context):
+        stack.append(0)
+        started = time.perf_counter()
+        try:
+            return original(template, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            nested = stack.pop()
+            if stack:
+                stack[-1] += elapsed
+            entry = stats[template.origin.template_name or '<строка>']
+            entry.renders += 1
+            entry.total += elapsed
+            entry.own += elapsed - nested
+
+    CompiledTemplate._render = _render
+    try:
+        yield stats
+    finally:
+        CompiledTemplate._render = original
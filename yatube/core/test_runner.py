@@ -0,0 +1,15 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class StrictQueryBudgetRunner(DiscoverRunner):
+    """Запускает тесты так, что превышение бюджета запросов — ошибка."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._strict_budget = override_settings(QUERY_BUDGET_STRICT=True)
+        self._strict_budget.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._strict_budget.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,51 @@
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+class OversizedUploadedFile(UploadedFile):
+    """Файл, приём которого прервали; данных не содержит."""
+
+    def __init__(self, name, content_type, size, charset):
+        super().__init__(BytesIO(), name, content_type, size, charset)
+
+
+class SizeLimitedUploadHandler(FileUploadHandler):
+    """Перестаёт принимать файл, как только он превысил MAX_UPLOAD_SIZE.
+
+    Обработчик стоит первым в FILE_UPLOAD_HANDLERS: байты сверх лимита
+    не передаются дальше и не попадают ни в память, ни во временный
+    файл, а форма получает ``OversizedUploadedFile`` с реальным
+    размером и выдаёт ошибку валидации.
+
+    Запрос, который по ``CONTENT_LENGTH`` заведомо больше лимита,
+    отклоняется с ответом 400 ещё до чтения тела.
+    """
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        limit = settings.MAX_UPLOAD_SIZE + settings.MAX_UPLOAD_FORM_SIZE
+        if content_length > limit:
+            raise RequestDataTooBig(
+                'Тело запроса больше MAX_UPLOAD_SIZE и MAX_UPLOAD_FORM_SIZE.'
+            )
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > settings.MAX_UPLOAD_SIZE:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > settings.MAX_UPLOAD_SIZE:
+            return OversizedUploadedFile(
+                self.file_name, self.content_type, self.received, self.charset
+            )
+        return None
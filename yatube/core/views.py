@@ -1,4 +1,15 @@
+import os
+import posixpath
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views import static
+
+from . import metrics as metrics_registry
+from .compression import SUFFIXES, accepted_encodings
 
 
 def page_not_found(request, exception):
@@ -7,3 +18,39 @@ def page_not_found(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics(request):
+    if request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS:
+        raise Http404
+    return HttpResponse(
+        metrics_registry.render_prometheus(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def serve_static(request, path):
+    """Собранная статика: сжатая копия и вечный кеш для хешированных имён."""
+    path = posixpath.normpath(path).lstrip('/')
+    if path.startswith('..'):
+        raise Http404
+    name = path
+    for encoding in accepted_encodings(request):
+        candidate = path + SUFFIXES[encoding]
+        if os.path.isfile(os.path.join(settings.STATIC_ROOT, candidate)):
+            name = candidate
+            break
+    response = static.serve(request, name, document_root=settings.STATIC_ROOT)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    if path in hashed_files.values():
+        # Содержимое под хешированным именем не меняется никогда
+        patch_cache_control(
+            response, public=True, max_age=settings.STATIC_MAX_AGE,
+            immutable=True,
+        )
+    else:
+        patch_cache_control(
+            response, public=True, max_age=settings.STATIC_UNHASHED_MAX_AGE
+        )
+    return response
@@ -0,0 +1,150 @@
+"""JSON API лент для мобильного клиента.
+
+Ленты строятся теми же запросами, что и HTML-страницы (``views.*_feed``),
+и листаются только курсором (``?cursor=``), без подсчёта числа постов.
+
+ETag и Last-Modified выводятся из поколения кеша лент, которое меняют
+сигналы при любой правке постов, комментариев, групп и авторов (а для
+ленты подписок — ещё и поколение подписок пользователя). Поэтому на
+повторный запрос с ``If-None-Match`` API отвечает 304, не обращаясь к
+таблице постов.
+"""
+import hashlib
+from functools import wraps
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import urlencode
+from django.views.decorators.http import condition
+
+from core.cache import generation_time, get_generation
+from core.query_budget import query_budget
+from . import timeline
+from .fragments import FEED_GENERATION
+from .models import Group, User
+from .paginator import CursorPaginator, DEFAULT_ORDERING
+from .views import (POSTS_PER_PAGE, follow_feed, group_feed, index_feed,
+                    profile_feed)
+
+# Меняется вместе с форматом ответа, чтобы сбросить ETag клиентов
+API_VERSION = '1'
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+
+
+def _generations(request, per_user):
+    if not hasattr(request, '_feed_generations'):
+        generations = [get_generation(FEED_GENERATION)]
+        if per_user and request.user.is_authenticated:
+            generations.append(get_generation(
+                timeline.generation_name(request.user.pk)
+            ))
+        request._feed_generations = generations
+    return request._feed_generations
+
+
+def conditional_feed(per_user=False):
+    """Условный GET по поколениям кеша вместо запроса к постам."""
+    def etag(request, *args, **kwargs):
+        parts = [API_VERSION, request.get_full_path()]
+        if per_user:
+            parts.append(str(request.user.pk))
+        parts.extend(_generations(request, per_user))
+        return hashlib.md5(':'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        times = [
+            generation_time(generation)
+            for generation in _generations(request, per_user)
+        ]
+        if None in times:
+            return None
+        return max(times)
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def api_login_required(view_func):
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse(
+                {'detail': 'Требуется авторизация'}, status=401,
+                json_dumps_params=JSON_PARAMS,
+            )
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def serialize_post(post):
+    return {
+        'id': post.id,
+        'text': post.text,
+        'pub_date': post.pub_date.isoformat(),
+        'author': post.author.username,
+        'group': post.group.slug if post.group else None,
+        'image': post.image.url if post.image else None,
+        'comments_count': post.comments_count,
+        'url': reverse('posts:api_post_detail', args=[post.id]),
+    }
+
+
+def feed_response(request, post_list, ordering=DEFAULT_ORDERING, **extra):
+    paginator = CursorPaginator(post_list, POSTS_PER_PAGE, ordering=ordering)
+    page = paginator.cursor_page(request.GET.get('cursor'))
+    next_url = None
+    if page.next_cursor:
+        next_url = '{}?{}'.format(
+            request.path, urlencode({'cursor': page.next_cursor})
+        )
+    return JsonResponse(
+        {**extra, 'results': [serialize_post(post) for post in page],
+         'next': next_url},
+        json_dumps_params=JSON_PARAMS,
+    )
+
+
+@conditional_feed()
+@query_budget(1)
+def index(request):
+    return feed_response(request, index_feed())
+
+
+@conditional_feed()
+@query_budget(2)
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group_feed(group), group={
+        'slug': group.slug,
+        'title': group.title,
+        'description': group.description,
+    })
+
+
+@conditional_feed()
+@query_budget(2)
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, profile_feed(author), author={
+        'username': author.username,
+        'full_name': author.get_full_name(),
+    })
+
+
+@api_login_required
+@conditional_feed(per_user=True)
+@query_budget(5)
+def follow_index(request):
+    post_list, ordering = follow_feed(request.user)
+    return feed_response(request, post_list, ordering=ordering)
+
+
+@conditional_feed()
+@query_budget(1)
+def post_detail(request, post_id):
+    post = get_object_or_404(index_feed(), pk=post_id)
+    data = serialize_post(post)
+    data['comments'] = '{}?format=json'.format(
+        reverse('posts:post_comments', args=[post.id])
+    )
+    return JsonResponse(data, json_dumps_params=JSON_PARAMS)
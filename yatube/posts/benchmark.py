@@ -0,0 +1,200 @@
+"""Замеры запросов к БД, задержки и пропускной способности страниц.
+
+Для каждого маршрута из ``posts.urls`` в ``ENDPOINTS`` описано, как его
+вызвать на данных из ``seed_load``: самый обсуждаемый пост, самый
+плодовитый автор, читатель с самой большой лентой подписок. Запрос
+выполняется тестовым клиентом Django сначала на пустом кеше (холодный),
+затем ``repeat`` раз подряд (тёплый). Записывающие маршруты выполняются
+в транзакции, которая откатывается, поэтому данные не меняются.
+
+Отчёт — JSON, который ``compare`` сравнивает с отчётом прошлого прогона.
+"""
+import contextlib
+import math
+import re
+import time
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+from django.test import Client
+from django.urls import resolve, reverse
+
+from core.query_budget import budget_of, count_queries
+from . import urls
+from .models import Comment, Follow, Group, Post, User
+
+Call = namedtuple(
+    'Call', 'method args data user rollback',
+    defaults=('get', (), None, None, False),
+)
+Targets = namedtuple('Targets', 'post author reader group word')
+
+ENDPOINTS = {
+    'index': lambda t: Call(),
+    'group_posts': lambda t: Call(args=[t.group.slug]),
+    'profile': lambda t: Call(args=[t.author.username]),
+    'post_detail': lambda t: Call(args=[t.post.pk]),
+    'post_search': lambda t: Call(data={'q': t.word}),
+    'post_create': lambda t: Call(user=t.author),
+    'post_edit': lambda t: Call(args=[t.post.pk], user=t.post.author),
+    'post_comments': lambda t: Call(args=[t.post.pk]),
+    'add_comment': lambda t: Call(
+        'post', [t.post.pk], {'text': 'Нагрузочный тест'}, t.reader, True
+    ),
+    'follow_index': lambda t: Call(user=t.reader),
+    'profile_follow': lambda t: Call(
+        args=[t.author.username], user=t.reader, rollback=True
+    ),
+    'profile_unfollow': lambda t: Call(
+        args=[t.author.username], user=t.reader, rollback=True
+    ),
+    'api_index': lambda t: Call(),
+    'api_post_detail': lambda t: Call(args=[t.post.pk]),
+    'api_group_posts': lambda t: Call(args=[t.group.slug]),
+    'api_profile': lambda t: Call(args=[t.author.username]),
+    'api_follow_index': lambda t: Call(user=t.reader),
+}
+# Метрики, рост которых считается ухудшением
+QUERY_METRICS = ('queries_cold', 'queries_warm')
+LATENCY_METRICS = ('cold_ms', 'p50_ms', 'p95_ms')
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+def route_names():
+    return [
+        pattern.name for pattern in urls.urlpatterns
+        if getattr(pattern, 'name', None)
+    ]
+
+
+def data_counts():
+    return {
+        model._meta.model_name: model.objects.count()
+        for model in (User, Group, Post, Comment, Follow)
+    }
+
+
+def find_targets():
+    post = Post.objects.select_related('author').order_by(
+        '-comments_count', 'pk'
+    ).first()
+    group = Group.objects.annotate(size=Count('posts')).order_by(
+        '-size', 'pk'
+    ).first()
+    if post is None or group is None:
+        raise BenchmarkError('Нет постов или групп — запустите seed_load')
+    author = User.objects.order_by('-stats__posts_count', 'pk').first()
+    reader = User.objects.exclude(pk=author.pk).order_by(
+        '-stats__following_count', 'pk'
+    ).first()
+    words = re.findall(r'\w{4,}', post.text)
+    return Targets(post, author, reader or author, group,
+                   words[0] if words else post.text)
+
+
+def client_for(call):
+    client = Client()
+    if call.user is not None:
+        client.force_login(call.user)
+    return client
+
+
+def send(client, name, call):
+    """Выполняет вызов; запись откатывается, если ``call.rollback``."""
+    url = reverse(f'posts:{name}', args=call.args)
+    rollback = transaction.atomic() if call.rollback else (
+        contextlib.nullcontext()
+    )
+    with rollback:
+        response = getattr(client, call.method)(url, call.data)
+        if call.rollback:
+            transaction.set_rollback(True)
+    return response
+
+
+def measure(name, call, repeat):
+    client = client_for(call)
+
+    def run():
+        with count_queries() as counter:
+            started = time.perf_counter()
+            response = send(client, name, call)
+            elapsed = time.perf_counter() - started
+        return elapsed * 1000, counter.count, response.status_code
+
+    cache.clear()
+    cold_ms, queries_cold, status = run()
+    warm = [run() for _ in range(repeat)]
+    latencies = [elapsed for elapsed, _, _ in warm]
+    return {
+        'status': status,
+        'budget': budget_of(
+            resolve(reverse(f'posts:{name}', args=call.args)).func
+        ),
+        'queries_cold': queries_cold,
+        'queries_warm': max(queries for _, queries, _ in warm),
+        'cold_ms': round(cold_ms, 2),
+        'mean_ms': round(sum(latencies) / len(latencies), 2),
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p95_ms': round(percentile(latencies, 95), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'rps': round(len(latencies) * 1000 / sum(latencies), 1),
+    }
+
+
+def run(size=None, names=None, repeat=20):
+    """Замеры маршрутов ``names`` (по умолчанию всех) на текущих данных.
+
+    Без ``size`` прогон подписывается числом постов в базе.
+    """
+    names = names or route_names()
+    unknown = set(names) - ENDPOINTS.keys()
+    if unknown:
+        raise BenchmarkError(
+            f'Не описан вызов маршрутов: {", ".join(sorted(unknown))}'
+        )
+    targets = find_targets()
+    counts = data_counts()
+    return {
+        'size': counts['post'] if size is None else size,
+        'counts': counts,
+        'endpoints': {
+            name: measure(name, ENDPOINTS[name](targets), repeat)
+            for name in names
+        },
+    }
+
+
+def compare(baseline, report, threshold):
+    """Строки (размер, маршрут, метрика, было, стало, ухудшение).
+
+    Рост числа запросов — всегда ухудшение, задержки — если выросли
+    больше чем на ``threshold`` процентов.
+    """
+    previous = {run['size']: run['endpoints'] for run in baseline['runs']}
+    rows = []
+    for current in report['runs']:
+        endpoints = previous.get(current['size'], {})
+        for name, metrics in current['endpoints'].items():
+            if name not in endpoints:
+                continue
+            for metric in QUERY_METRICS + LATENCY_METRICS:
+                old, new = endpoints[name].get(metric), metrics[metric]
+                if old is None:
+                    continue
+                if metric in QUERY_METRICS:
+                    worse = new > old
+                else:
+                    worse = new > old * (1 + threshold / 100)
+                rows.append((current['size'], name, metric, old, new, worse))
+    return rows
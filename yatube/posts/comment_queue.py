@@ -0,0 +1,281 @@
+"""Отложенная пакетная запись комментариев (write-behind).
+
+При ``COMMENT_WRITE_BEHIND`` view ``add_comment`` не пишет комментарий в
+базу, а ставит его в очередь процесса. Очередь записывается одной
+транзакцией ``bulk_create`` раз в ``COMMENT_FLUSH_INTERVAL`` секунд или
+сразу, как только в ней ``COMMENT_FLUSH_SIZE`` комментариев.
+
+До ответа пользователю комментарий дописывается в журнал процесса в
+``COMMENT_SPOOL_DIR`` (с ``fsync``), а после записи пачки журнал
+удаляется. Журналы упавших процессов дописываются в базу при создании
+очереди или командой ``flush_comment_spool``; живой процесс держит
+``flock`` на своём журнале, поэтому его не трогают.
+
+Автор видит свой комментарий сразу: очередь запоминает его в кеше, и
+``post_detail`` подмешивает ещё не записанные комментарии автора.
+Каждый комментарий лежит в кеше под своим ключом с номером от
+атомарного ``incr``, поэтому одновременные комментарии не затирают
+друг друга.
+"""
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from core.cache import bump_generation
+from . import counters
+from .fragments import FEED_GENERATION
+from .models import Comment, Post, User
+
+logger = logging.getLogger(__name__)
+
+# Сколько секунд автор видит свой комментарий из кеша; с запасом больше
+# интервала записи и отставания реплик
+PENDING_TIMEOUT = 60
+SPOOL_PATTERN = 'comments-*.jsonl'
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def _pending_key(post_id, user_id):
+    return f'pending_comments:{post_id}:{user_id}'
+
+
+def _remember_pending(record):
+    key = _pending_key(record['post'], record['author'])
+    cache.add(key, 0, PENDING_TIMEOUT)
+    number = cache.incr(key)
+    cache.touch(key, PENDING_TIMEOUT)
+    cache.set(f'{key}:{number}', record, PENDING_TIMEOUT)
+
+
+def _pending_records(post_id, user_id):
+    key = _pending_key(post_id, user_id)
+    count = cache.get(key)
+    if not count:
+        return []
+    keys = [f'{key}:{number}' for number in range(1, count + 1)]
+    records = cache.get_many(keys)
+    return [records[key] for key in keys if key in records]
+
+
+def write_comments(records):
+    """Записывает комментарии пачкой и обновляет то, что делают сигналы."""
+    post_ids = set(Post.objects.filter(
+        pk__in={record['post'] for record in records}
+    ).values_list('pk', flat=True))
+    user_ids = set(User.objects.filter(
+        pk__in={record['author'] for record in records}
+    ).values_list('pk', flat=True))
+    # Комментарии к удалённым постам удалились бы вместе с постом
+    records = [
+        record for record in records
+        if record['post'] in post_ids and record['author'] in user_ids
+    ]
+    if not records:
+        return 0
+    with transaction.atomic():
+        Comment.objects.bulk_create(
+            Comment(
+                post_id=record['post'],
+                author_id=record['author'],
+                text=record['text'],
+            )
+            for record in records
+        )
+        added = Counter(record['post'] for record in records)
+        for post_id, count in added.items():
+            counters.bump_comments_count(post_id, count)
+    bump_generation(FEED_GENERATION)
+    return len(records)
+
+
+def _not_written(records):
+    """Записи журнала, которых ещё нет в базе.
+
+    Процесс мог упасть между записью пачки и удалением журнала, поэтому
+    запись считается сделанной, если у поста есть комментарий автора с
+    тем же текстом не раньше постановки в очередь.
+    """
+    return [
+        record for record in records
+        if not Comment.objects.filter(
+            post_id=record['post'],
+            author_id=record['author'],
+            text=record['text'],
+            created__gte=parse_datetime(record['created']),
+        ).exists()
+    ]
+
+
+def _read_spool(spool):
+    records = []
+    for line in spool:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            # Недописанная при падении строка
+            continue
+    return records
+
+
+def recover(directory):
+    """Дописывает в базу журналы завершившихся процессов."""
+    written = 0
+    for path in sorted(glob.glob(os.path.join(directory, SPOOL_PATTERN))):
+        with open(path, encoding='utf-8') as spool:
+            try:
+                fcntl.flock(spool, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                continue
+            records = _not_written(_read_spool(spool))
+            if records:
+                written += write_comments(records)
+            os.remove(path)
+    return written
+
+
+class CommentQueue:
+    def __init__(self, directory, flush_size, flush_interval):
+        self.directory = directory
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = []
+        self._spool = None
+        self._worker = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _append(self, records):
+        # Вызывается под self._lock
+        if self._spool is None:
+            path = os.path.join(
+                self.directory,
+                f'comments-{os.getpid()}-{uuid.uuid4().hex}.jsonl',
+            )
+            self._spool = open(path, 'a', encoding='utf-8')
+            fcntl.flock(self._spool, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        for record in records:
+            self._spool.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+        self._pending.extend(records)
+
+    def enqueue(self, comment):
+        record = {
+            'post': comment.post_id,
+            'author': comment.author_id,
+            'text': comment.text,
+            'created': timezone.now().isoformat(),
+        }
+        with self._lock:
+            self._append([record])
+            full = len(self._pending) >= self.flush_size
+        _remember_pending(record)
+        if full:
+            self.flush()
+        else:
+            self._start_worker()
+
+    def flush(self):
+        """Записывает очередь в базу; возвращает число комментариев."""
+        with self._flush_lock:
+            with self._lock:
+                records, self._pending = self._pending, []
+                spool, self._spool = self._spool, None
+            if spool is None:
+                return 0
+            try:
+                written = write_comments(records)
+            except Exception:
+                # Пачка возвращается в очередь и в новый журнал, а старый
+                # журнал удаляется только после этого
+                with self._lock:
+                    pending, self._pending = self._pending, []
+                    self._append(records)
+                    self._pending.extend(pending)
+                spool.close()
+                os.remove(spool.name)
+                raise
+            spool.close()
+            os.remove(spool.name)
+            return written
+
+    def _start_worker(self):
+        if self._worker is not None or not self.flush_interval:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._run, name='comment-queue', daemon=True
+                )
+                self._worker.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception('Не удалось записать очередь комментариев')
+            finally:
+                close_old_connections()
+
+
+def get_queue():
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            directory = settings.COMMENT_SPOOL_DIR
+            os.makedirs(directory, exist_ok=True)
+            recover(directory)
+            _queue = CommentQueue(
+                directory,
+                settings.COMMENT_FLUSH_SIZE,
+                settings.COMMENT_FLUSH_INTERVAL,
+            )
+        return _queue
+
+
+@atexit.register
+def shutdown():
+    """Записывает очередь и забывает её (при выходе и в тестах)."""
+    global _queue
+    with _queue_lock:
+        queue, _queue = _queue, None
+    if queue is not None:
+        queue.flush()
+
+
+def pending_comments(post, user):
+    """Ещё не записанные в базу комментарии ``user`` к посту, новые первыми."""
+    if not user.is_authenticated:
+        return []
+    records = _pending_records(post.pk, user.pk)
+    if not records:
+        return []
+    since = min(parse_datetime(record['created']) for record in records)
+    written = Counter(post.comments.filter(
+        author=user, created__gte=since
+    ).values_list('text', flat=True))
+    pending = []
+    for record in reversed(records):
+        if written[record['text']]:
+            written[record['text']] -= 1
+            continue
+        pending.append(Comment(post=post, author=user, text=record['text']))
+    return pending
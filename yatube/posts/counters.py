@@ -0,0 +1,68 @@
+"""Денормализованные счётчики постов, комментариев и подписчиков.
+
+Счётчики меняются атомарно через ``F()`` в сигналах создания и
+удаления объектов; расхождения исправляет команда
+``manage.py reconcile_counters``.
+"""
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+
+
+def _bump(queryset, name, delta):
+    if delta < 0:
+        # Счётчик не уходит в минус, даже если уже разошёлся с данными
+        queryset = queryset.filter(**{f'{name}__gte': -delta})
+    return queryset.update(**{name: F(name) + delta})
+
+
+def bump_user_stats(user_id, name, delta):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if not _bump(stats, name, delta) and delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        _bump(stats, name, delta)
+
+
+def bump_comments_count(post_id, delta):
+    _bump(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def _count(queryset, field, outer_field):
+    subquery = queryset.filter(**{field: OuterRef(outer_field)}).order_by(
+    ).values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(subquery, output_field=IntegerField()), 0)
+
+
+def _fix(model, name, expression):
+    drifted = model.objects.annotate(actual=expression).exclude(
+        **{name: F('actual')}
+    ).values('pk')
+    return model.objects.filter(pk__in=drifted).update(
+        **{name: expression}
+    )
+
+
+def reconcile():
+    """Пересчитывает счётчики; возвращает число исправленных строк."""
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True)
+        ),
+        ignore_conflicts=True,
+    )
+    counters = (
+        (UserStats, 'posts_count', Post, 'author', 'user_id'),
+        (UserStats, 'followers_count', Follow, 'author', 'user_id'),
+        (UserStats, 'following_count', Follow, 'user', 'user_id'),
+        (Post, 'comments_count', Comment, 'post', 'pk'),
+    )
+    return {
+        name: _fix(
+            model, name, _count(source.objects.all(), field, outer_field)
+        )
+        for model, name, source, field, outer_field in counters
+    }
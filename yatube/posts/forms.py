@@ -1,11 +1,57 @@
 from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+from .images import header_size, sanitize_upload
 from .models import Post, Comment
 
 
+class BoundedImageField(forms.ImageField):
+    """Картинка с ограничением размера файла и числа пикселей."""
+
+    def to_python(self, data):
+        if data and data.size > settings.MAX_UPLOAD_SIZE:
+            raise ValidationError(
+                'Файл больше %(limit)s.',
+                code='file_too_large',
+                params={'limit': filesizeformat(settings.MAX_UPLOAD_SIZE)},
+            )
+        if data:
+            self.check_resolution(data)
+        upload = super().to_python(data)
+        if upload is None:
+            return None
+        return sanitize_upload(upload)
+
+    def check_resolution(self, data):
+        """Проверяет разрешение по заголовку, до декодирования пикселей."""
+        try:
+            width, height = header_size(data)
+        except Image.DecompressionBombError:
+            raise ValidationError(
+                'Слишком большое разрешение картинки.',
+                code='image_too_large',
+            )
+        except (OSError, SyntaxError):
+            # Не картинка: ошибку выдаст ImageField
+            return
+        if width * height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Слишком большое разрешение картинки: %(width)s×%(height)s.',
+                code='image_too_large',
+                params={'width': width, 'height': height},
+            )
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {
+            'image': BoundedImageField,
+        }
         labels = {
             'text': 'Текст поста',
             'group': 'Группа',
@@ -15,6 +61,12 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост',
         }
 
+    def save(self, commit=True):
+        if 'image' in self.changed_data:
+            # Варианты прежней картинки к новой не подходят
+            self.instance.image_variants = ''
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
@@ -0,0 +1,110 @@
+"""Кеш отрисованных карточек постов.
+
+Ключ карточки содержит версии поста, его группы и автора. Сигналы
+меняют версию при сохранении или удалении объекта, и карточка
+перерисовывается при следующем обращении; старые записи вытесняются
+кешем сами.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from core import metrics
+from core.db_routers import replica_cache_timeout
+
+CARD_TEMPLATE = 'posts/includes/post_card.html'
+# Поколение закешированных страниц ленты: меняется при любом изменении
+# постов, групп, комментариев и авторов
+FEED_GENERATION = 'feed'
+
+metrics.describe('post_card_cache_hits', 'Карточки постов, взятые из кеша')
+metrics.describe(
+    'post_card_cache_misses', 'Карточки постов, отрисованные заново'
+)
+
+
+def _version_key(kind, pk):
+    return f'post_card_version:{kind}:{pk}'
+
+
+def bump_version(kind, pk):
+    """Делает недействительными карточки, зависящие от объекта."""
+    cache.set(_version_key(kind, pk), uuid.uuid4().hex, None)
+
+
+def _version_keys(post):
+    keys = [
+        _version_key('post', post.pk),
+        _version_key('author', post.author_id),
+    ]
+    if post.group_id:
+        keys.append(_version_key('group', post.group_id))
+    return keys
+
+
+def _load_versions(keys):
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            versions[key] = uuid.uuid4().hex
+            if not cache.add(key, versions[key], None):
+                versions[key] = cache.get(key, versions[key])
+    return versions
+
+
+def _flags(options):
+    return ':'.join(f'{name}={options[name]}' for name in sorted(options))
+
+
+def _card_key(post, versions, flags):
+    keys = _version_keys(post)
+    return 'post_card:{}:{}:{}'.format(
+        post.pk, ':'.join(versions[key] for key in keys), flags
+    )
+
+
+def prefetch_cards(posts, **options):
+    """Загружает карточки всей страницы за два обращения к кешу.
+
+    Найденный HTML и ключи запоминаются в объектах постов, и
+    ``render_card`` для них уже не обращается к кешу. Возвращает посты,
+    карточки которых придётся отрисовать.
+    """
+    posts = list(posts)
+    flags = _flags(options)
+    versions = _load_versions(
+        list({key for post in posts for key in _version_keys(post)})
+    )
+    keys = {_card_key(post, versions, flags): post for post in posts}
+    found = cache.get_many(list(keys))
+    for key, post in keys.items():
+        if not hasattr(post, '_prefetched_cards'):
+            post._prefetched_cards = {}
+        post._prefetched_cards[flags] = (key, found.get(key))
+    return [post for key, post in keys.items() if found.get(key) is None]
+
+
+def render_card(post, **options):
+    """Возвращает HTML карточки поста, по возможности из кеша."""
+    flags = _flags(options)
+    prefetched = getattr(post, '_prefetched_cards', {})
+    if flags in prefetched:
+        key, html = prefetched[flags]
+    else:
+        key = _card_key(post, _load_versions(_version_keys(post)), flags)
+        html = cache.get(key)
+    if html is not None:
+        metrics.incr('post_card_cache_hits')
+        return html
+    metrics.incr('post_card_cache_misses')
+    html = render_to_string(CARD_TEMPLATE, {
+        'post': post,
+        'image_sizes': settings.POST_IMAGE_SIZES,
+        **options,
+    })
+    cache.set(key, html, replica_cache_timeout(
+        settings.POST_CARD_CACHE_TIMEOUT, post._state.db
+    ))
+    return html
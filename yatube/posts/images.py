@@ -0,0 +1,136 @@
+"""Адаптивные варианты картинок постов для ``srcset``.
+
+Для каждой ширины из ``POST_IMAGE_WIDTHS`` и каждого формата из
+``POST_IMAGE_FORMATS`` рядом с оригиналом сохраняется файл
+``<имя с расширением>.w<ширина>.<формат>`` с тем же кадрированием, что и
+у миниатюр карточек. Форматы, которые не умеет сохранять установленный
+Pillow (например, AVIF без плагина), пропускаются.
+
+Готовые форматы записываются в ``Post.image_variants``, поэтому
+отрисовка карточки не проверяет файлы в хранилище.
+"""
+import io
+import logging
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Форматы, которые могут нести EXIF и потому всегда перекодируются
+REENCODE_FORMATS = ('JPEG', 'MPO', 'PNG', 'TIFF', 'WEBP')
+
+MIME_TYPES = {
+    'webp': 'image/webp',
+    'avif': 'image/avif',
+}
+
+
+def available_formats():
+    # Image.SAVE заполняется только после загрузки плагинов Pillow
+    Image.init()
+    return [
+        fmt for fmt in settings.POST_IMAGE_FORMATS
+        if fmt.upper() in Image.SAVE
+    ]
+
+
+def variant_name(name, width, fmt):
+    # Расширение оригинала сохраняется: у a.jpg и a.png разные варианты
+    return f'{name}.w{width}.{fmt}'
+
+
+def _variant_size(width):
+    card_width, card_height = map(int, settings.POST_IMAGE_RATIO.split('x'))
+    return width, round(width * card_height / card_width)
+
+
+def generate_variants(name, storage=default_storage):
+    """Сохраняет все варианты картинки; вызывается в рабочем потоке.
+
+    Возвращает сохранённые форматы.
+    """
+    formats = available_formats()
+    if not formats:
+        return []
+    with storage.open(name) as source:
+        image = Image.open(source)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    for width in settings.POST_IMAGE_WIDTHS:
+        variant = ImageOps.fit(
+            image, _variant_size(width), Image.LANCZOS, centering=(0.5, 0.5)
+        )
+        for fmt in formats:
+            buffer = io.BytesIO()
+            variant.save(
+                buffer, fmt.upper(), quality=settings.POST_IMAGE_QUALITY
+            )
+            target = variant_name(name, width, fmt)
+            storage.delete(target)
+            storage.save(target, ContentFile(buffer.getvalue()))
+    return formats
+
+
+def sources(post, storage=default_storage):
+    """Описание ``<source>`` для каждого готового формата картинки."""
+    name = post.image.name
+    if not name or not post.image_variants:
+        return []
+    widths = settings.POST_IMAGE_WIDTHS
+    result = []
+    for fmt in post.image_variants.split(','):
+        srcset = ', '.join(
+            f'{storage.url(variant_name(name, width, fmt))} {width}w'
+            for width in widths
+        )
+        result.append({
+            'type': MIME_TYPES.get(fmt, f'image/{fmt}'),
+            'srcset': srcset,
+        })
+    return result
+
+
+def header_size(upload):
+    """Ширина и высота картинки по заголовку файла.
+
+    Пиксели не декодируются, поэтому разрешение можно проверить до
+    ``verify()`` и перекодирования. Картинку, которую Pillow считает
+    бомбой декомпрессии, функция не открывает и пробрасывает
+    ``Image.DecompressionBombError``.
+    """
+    upload.seek(0)
+    try:
+        return Image.open(upload).size
+    finally:
+        upload.seek(0)
+
+
+def sanitize_upload(upload):
+    """Перекодирует загруженную картинку без EXIF и не больше
+    ``POST_IMAGE_MAX_SIDE`` по большей стороне."""
+    max_side = settings.POST_IMAGE_MAX_SIDE
+    upload.seek(0)
+    image = Image.open(upload)
+    image_format = image.format
+    too_big = max(image.size) > max_side
+    if image_format not in REENCODE_FORMATS and not too_big:
+        upload.seek(0)
+        return upload
+    if image_format in ('JPEG', 'MPO'):
+        # JPEG декодируется сразу в уменьшенном масштабе
+        image.draft('RGB', (max_side, max_side))
+        image_format = 'JPEG'
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((max_side, max_side), Image.LANCZOS)
+    buffer = io.BytesIO()
+    options = {'quality': settings.POST_IMAGE_QUALITY}
+    if image_format == 'JPEG' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    image.save(buffer, image_format, **options)
+    return SimpleUploadedFile(
+        upload.name, buffer.getvalue(), Image.MIME.get(image_format)
+    )
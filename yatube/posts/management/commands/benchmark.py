@@ -0,0 +1,137 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from posts import benchmark, seeding
+
+
+def parse_sizes(value):
+    try:
+        return sorted({int(size) for size in value.split(',')})
+    except ValueError:
+        raise CommandError(f'Размеры через запятую, а не {value!r}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число SQL-запросов, задержку и пропускную способность '
+        'страниц posts на текущей базе или на тестовой базе с данными '
+        'разного объёма; сохраняет отчёт JSON и сравнивает с прошлым'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='имена маршрутов posts; по умолчанию все',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--sizes', type=parse_sizes,
+            help='числа постов через запятую, например 1000,10000: '
+                 'замер на тестовой базе, заполненной seed_load',
+        )
+        parser.add_argument('--skew', type=float,
+                            default=seeding.DEFAULT_SKEW)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='файл для отчёта JSON')
+        parser.add_argument('--compare', help='отчёт JSON прошлого прогона')
+        parser.add_argument(
+            '--threshold', type=float, default=20,
+            help='рост задержки в процентах, который считается ухудшением',
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help='завершиться с ошибкой, если что-то ухудшилось',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['sizes']:
+                runs = self.run_sizes(options)
+            else:
+                runs = [benchmark.run(
+                    names=options['names'], repeat=options['repeat']
+                )]
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+        report = {
+            'created': timezone.now().isoformat(),
+            'repeat': options['repeat'],
+            'runs': runs,
+        }
+        for run in runs:
+            self.print_run(run)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, ensure_ascii=False, indent=2)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as baseline:
+                rows = benchmark.compare(
+                    json.load(baseline), report, options['threshold']
+                )
+            worse = self.print_comparison(rows)
+            if worse and options['fail_on_regression']:
+                raise CommandError(f'Ухудшений: {worse}')
+
+    def run_sizes(self, options):
+        """Замеры на временной тестовой базе, дополняемой до каждого размера.
+
+        Реплики отключены: тестовая база создаётся только для ``default``.
+        """
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        seeder = seeding.Seeder(skew=options['skew'], seed=options['seed'])
+        runs, seeded = [], 0
+        try:
+            with override_settings(DATABASE_REPLICAS=[]):
+                for size in options['sizes']:
+                    self.stderr.write(f'Заполнение до {size} постов')
+                    seeder.seed(**seeding.volumes(size - seeded))
+                    seeded = size
+                    runs.append(benchmark.run(
+                        size, options['names'], options['repeat']
+                    ))
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+        return runs
+
+    def print_run(self, run):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f'Размер {run["size"]}: ' + ', '.join(
+                f'{name} {count}' for name, count in run['counts'].items()
+            )
+        ))
+        self.stdout.write(
+            f'{"маршрут":<18}{"код":>5}{"запросы":>10}{"бюджет":>8}'
+            f'{"холодный":>10}{"p50":>8}{"p95":>8}{"p99":>8}{"rps":>8}'
+        )
+        for name, metrics in run['endpoints'].items():
+            queries = f'{metrics["queries_cold"]}/{metrics["queries_warm"]}'
+            budget = metrics['budget'] if metrics['budget'] is not None else ''
+            self.stdout.write(
+                f'{name:<18}{metrics["status"]:>5}{queries:>10}{budget:>8}'
+                f'{metrics["cold_ms"]:>10.1f}{metrics["p50_ms"]:>8.1f}'
+                f'{metrics["p95_ms"]:>8.1f}{metrics["p99_ms"]:>8.1f}'
+                f'{metrics["rps"]:>8.1f}'
+            )
+
+    def print_comparison(self, rows):
+        worse = 0
+        for size, name, metric, old, new, regression in rows:
+            if old == new:
+                continue
+            change = f'{(new - old) / old * 100:+.0f}%' if old else ''
+            line = f'{size} {name} {metric}: {old} -> {new} {change}'
+            if regression:
+                worse += 1
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if not worse:
+            self.stdout.write(self.style.SUCCESS('Ухудшений нет'))
+        return worse
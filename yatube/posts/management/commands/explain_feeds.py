@@ -0,0 +1,57 @@
+import re
+
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+from posts.models import Comment, Group, Post, User
+from posts.paginator import DEFAULT_ORDERING
+from posts.views import POSTS_PER_PAGE
+
+INDEX_RE = re.compile(r'USING (?:COVERING )?INDEX (\w+)')
+
+
+class Command(BaseCommand):
+    help = 'Показывает планы запросов лент (EXPLAIN) и используемые индексы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--group', help='slug группы')
+        parser.add_argument('--author', help='username автора')
+        parser.add_argument('--user', help='username читателя ленты')
+        parser.add_argument('--post', type=int, help='id поста')
+
+    def handle(self, *args, **options):
+        group = self._get(Group, slug=options['group'])
+        author = self._get(User, username=options['author'])
+        reader = self._get(User, username=options['user'])
+        post = self._get(Post, pk=options['post'])
+        feeds = {
+            'index': Post.objects.all(),
+            'group_posts': group and group.posts.all(),
+            'profile': author and author.posts.all(),
+            'post_detail': post and Comment.objects.filter(
+                post=post
+            ).order_by('-created', '-id'),
+        }
+        if reader:
+            posts, ordering = timeline.feed_for(reader)
+            feeds['follow_index'] = posts.order_by(*ordering)
+        for name, queryset in feeds.items():
+            if queryset is None:
+                self.stdout.write(f'{name}: нет данных, пропущено')
+                continue
+            if queryset.model is Post:
+                queryset = queryset.select_related('author', 'group')
+                if name != 'follow_index':
+                    queryset = queryset.order_by(*DEFAULT_ORDERING)
+            plan = queryset[:POSTS_PER_PAGE].explain()
+            indexes = ', '.join(INDEX_RE.findall(plan)) or 'не используются'
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(plan)
+            self.stdout.write(f'Индексы: {indexes}\n')
+
+    def _get(self, model, **lookup):
+        field, value = next(iter(lookup.items()))
+        queryset = model.objects.order_by('pk')
+        if value is not None:
+            return queryset.filter(**{field: value}).first()
+        return queryset.first()
@@ -0,0 +1,76 @@
+import csv
+import json
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import FIELDS, export_records
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в JSON Lines '
+        '(один файл) или CSV (каталог с файлом на модель)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            help='файл .jsonl (или «-» для stdout) либо каталог для CSV',
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl'
+        )
+        parser.add_argument(
+            '--models', default=','.join(FIELDS),
+            help='модели через запятую: ' + ', '.join(FIELDS),
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        names = [name for name in options['models'].split(',') if name]
+        unknown = set(names) - FIELDS.keys()
+        if unknown:
+            raise CommandError(f'Неизвестные модели: {", ".join(unknown)}')
+        names = [name for name in FIELDS if name in names]
+        export = self.export_csv if options['format'] == 'csv' else (
+            self.export_jsonl
+        )
+        export(options['output'], names, options['chunk_size'])
+
+    def progress(self, name, count):
+        # При выводе в stdout отчёт идёт в stderr, чтобы не портить данные
+        self.stderr.write(f'{name}: выгружено {count}', ending='\n')
+
+    def export_rows(self, name, chunk_size, write):
+        count = 0
+        for record in export_records(name, chunk_size):
+            write(record)
+            count += 1
+            if count % (chunk_size * 10) == 0:
+                self.progress(name, count)
+        self.progress(name, count)
+
+    def export_jsonl(self, output, names, chunk_size):
+        stream = sys.stdout if output == '-' else open(
+            output, 'w', encoding='utf-8'
+        )
+        try:
+            for name in names:
+                self.export_rows(name, chunk_size, lambda record: stream.write(
+                    json.dumps({'model': name, **record}, ensure_ascii=False)
+                    + '\n'
+                ))
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+    def export_csv(self, output, names, chunk_size):
+        os.makedirs(output, exist_ok=True)
+        for name in names:
+            path = os.path.join(output, f'{name}.csv')
+            with open(path, 'w', encoding='utf-8', newline='') as stream:
+                writer = csv.DictWriter(stream, fieldnames=list(FIELDS[name]))
+                writer.writeheader()
+                self.export_rows(name, chunk_size, writer.writerow)
@@ -0,0 +1,20 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.comment_queue import recover
+
+
+class Command(BaseCommand):
+    help = (
+        'Дописывает в базу комментарии из журналов отложенной записи, '
+        'оставшихся после завершившихся процессов'
+    )
+
+    def handle(self, *args, **options):
+        directory = settings.COMMENT_SPOOL_DIR
+        written = recover(directory) if os.path.isdir(directory) else 0
+        self.stdout.write(self.style.SUCCESS(
+            f'Записано комментариев: {written}'
+        ))
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Строит миниатюры для уже загруженных картинок постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='число параллельных потоков',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        total = names.count()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            done = 0
+            for _ in pool.map(thumbnails.generate, names.iterator()):
+                done += 1
+                if done % 100 == 0 or done == total:
+                    self.stdout.write(f'Обработано {done} из {total}')
+        self.stdout.write(self.style.SUCCESS('Миниатюры построены'))
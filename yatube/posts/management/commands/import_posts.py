@@ -0,0 +1,69 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из JSON Lines или '
+        'CSV пачками bulk_create; с --checkpoint прерванный импорт '
+        'продолжается с места остановки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('input', help='файл .jsonl или каталог с CSV')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='файл с позицией импорта; создаётся и обновляется после '
+                 'каждой пачки',
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='не пересчитывать счётчики, ленты и поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        source = options['input']
+        if os.path.isdir(source):
+            rows = transfer.read_csv(source)
+        elif os.path.isfile(source):
+            rows = transfer.read_jsonl(source)
+        else:
+            raise CommandError(f'Нет файла или каталога {source}')
+        checkpoint = transfer.Checkpoint(options['checkpoint'])
+        batch_size = options['batch_size']
+        batch, batch_name, position = [], None, None
+        imported = {}
+
+        def flush():
+            if not batch:
+                return
+            transfer.import_batch(
+                batch_name, batch, derived=not options['no_rebuild']
+            )
+            checkpoint.save(*position)
+            imported[batch_name] = imported.get(batch_name, 0) + len(batch)
+            self.stdout.write(
+                f'{batch_name}: загружено {imported[batch_name]} '
+                f'({position[0]}, строка {position[1]})'
+            )
+            batch.clear()
+
+        for file_name, number, name, record in rows:
+            if checkpoint.done(file_name, number):
+                continue
+            if name not in transfer.MODELS:
+                raise CommandError(f'{file_name}:{number}: модель {name}?')
+            if name != batch_name or len(batch) >= batch_size:
+                flush()
+                batch_name = name
+            batch.append(record)
+            position = (file_name, number)
+        flush()
+        if not options['no_rebuild']:
+            self.stdout.write('Пересчёт счётчиков, лент и поиска')
+            transfer.rebuild_derived(full=False)
+        self.stdout.write(self.style.SUCCESS('Импорт завершён'))
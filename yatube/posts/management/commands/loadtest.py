@@ -0,0 +1,154 @@
+import asyncio
+import io
+import itertools
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.core.wsgi import get_wsgi_application
+from django.urls import reverse
+
+from core.asgi import ASGIHandler, build_environ
+from posts.benchmark import percentile
+from posts.models import Group, Post, User
+
+
+def make_scope(path):
+    path, _, query = path.partition('?')
+    return {
+        'type': 'http',
+        'method': 'GET',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'headers': [(b'host', b'localhost')],
+        'server': ('localhost', 80),
+        'client': ('127.0.0.1', 0),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест лент: запросов в секунду и p50/p99 задержки '
+        'для WSGI- и ASGI-обработчиков или для запущенного сервера'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='*',
+            help='адреса страниц; по умолчанию index, group_posts, '
+                 'profile и post_detail',
+        )
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument(
+            '--base-url',
+            help='адрес запущенного сервера (например, gunicorn или '
+                 'uvicorn); без него обработчики вызываются в процессе',
+        )
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or self.default_paths()
+        paths = list(itertools.islice(
+            itertools.cycle(paths), options['requests']
+        ))
+        concurrency = options['concurrency']
+        self.stdout.write(
+            f'{len(paths)} запросов, {concurrency} одновременно'
+        )
+        if options['base_url']:
+            runners = {'http': lambda: self.run_http(
+                options['base_url'], paths, concurrency
+            )}
+        else:
+            wsgi = get_wsgi_application()
+            asgi = ASGIHandler(wsgi)
+            runners = {
+                'wsgi': lambda: self.run_wsgi(wsgi, paths, concurrency),
+                'asgi': lambda: asyncio.run(
+                    self.run_asgi(asgi, paths, concurrency)
+                ),
+            }
+        for name, run in runners.items():
+            run()  # прогрев кешей
+            started = time.perf_counter()
+            results = run()
+            self.report(name, results, time.perf_counter() - started)
+
+    def default_paths(self):
+        paths = [reverse('posts:index')]
+        group = Group.objects.order_by('pk').first()
+        if group:
+            paths.append(reverse('posts:group_posts', args=[group.slug]))
+        author = User.objects.filter(posts__isnull=False).first()
+        if author:
+            paths.append(reverse('posts:profile', args=[author.username]))
+        post = Post.objects.order_by('pk').first()
+        if post:
+            paths.append(reverse('posts:post_detail', args=[post.pk]))
+        return paths
+
+    def run_wsgi(self, application, paths, concurrency):
+        def request(path):
+            response = {}
+
+            def start_response(status, headers, exc_info=None):
+                response['status'] = int(status.split(' ', 1)[0])
+
+            started = time.perf_counter()
+            result = application(
+                build_environ(make_scope(path), io.BytesIO()), start_response
+            )
+            try:
+                b''.join(result)
+            finally:
+                result.close()
+            return time.perf_counter() - started, response['status']
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(request, paths))
+
+    async def run_asgi(self, application, paths, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def request(path):
+            messages = []
+
+            async def send(message):
+                messages.append(message)
+
+            async with semaphore:
+                started = time.perf_counter()
+                await application(make_scope(path), receive, send)
+                return time.perf_counter() - started, messages[0]['status']
+
+        return await asyncio.gather(*(request(path) for path in paths))
+
+    def run_http(self, base_url, paths, concurrency):
+        def request(path):
+            started = time.perf_counter()
+            try:
+                with urllib.request.urlopen(base_url + path) as response:
+                    response.read()
+                    status = response.status
+            except urllib.error.HTTPError as error:
+                status = error.code
+            return time.perf_counter() - started, status
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            return list(pool.map(request, paths))
+
+    def report(self, name, results, elapsed):
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, status in results if status >= 400)
+        self.stdout.write(
+            f'{name}: {len(results) / elapsed:.1f} запросов/с, '
+            f'p50 {percentile(latencies, 50) * 1000:.1f} мс, '
+            f'p99 {percentile(latencies, 99) * 1000:.1f} мс, '
+            f'ошибок {errors}'
+        )
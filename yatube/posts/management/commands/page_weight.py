@@ -0,0 +1,99 @@
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from core.compression import SUFFIXES, compress
+
+ASSET_URL = re.compile(r'(?:href|src)="{}([^"?#]+)'.format(
+    re.escape(settings.STATIC_URL)
+))
+
+
+def read_static(name):
+    """Содержимое файла статики: собранного, а если его нет — исходного."""
+    if settings.STATIC_ROOT and staticfiles_storage.exists(name):
+        with staticfiles_storage.open(name) as static_file:
+            return static_file.read()
+    path = finders.find(name)
+    if path is None:
+        return None
+    with open(path, 'rb') as static_file:
+        return static_file.read()
+
+
+def served_size(data, encodings):
+    """Размер файла, который отдаст serve_static после collectstatic."""
+    if len(data) >= settings.COMPRESSION_MIN_SIZE:
+        # Как CompressedManifestStaticFilesStorage: копия сохраняется,
+        # только если она меньше файла, и отдаётся первая подходящая
+        for encoding in encodings:
+            compressed = compress(data, encoding, best=True)
+            if len(compressed) < len(data):
+                return len(compressed)
+    return len(data)
+
+
+def kilobytes(size):
+    return f'{size / 1024:.1f} КБ'
+
+
+class Command(BaseCommand):
+    help = (
+        'Объём страницы при передаче: HTML и статика без сжатия и со '
+        'сжатием (CompressionMiddleware и копии .gz/.br из collectstatic)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'urls', nargs='*',
+            help='адреса страниц; по умолчанию главная',
+        )
+
+    def handle(self, *args, **options):
+        encodings = list(SUFFIXES)
+        self.stdout.write(
+            'Сжатие: ' + ', '.join(encodings)
+            + ('' if 'br' in encodings else ' (пакет brotli не установлен)')
+        )
+        for url in options['urls'] or [reverse('posts:index')]:
+            self.measure(url, encodings)
+
+    def measure(self, url, encodings):
+        client = Client()
+        raw = client.get(url)
+        if raw.status_code != 200:
+            raise CommandError(f'{url}: ответ {raw.status_code}')
+        encoded = client.get(url, HTTP_ACCEPT_ENCODING=', '.join(encodings))
+        self.stdout.write(self.style.MIGRATE_HEADING(url))
+        before = len(raw.content)
+        after = len(encoded.content)
+        self.stdout.write(
+            f'{"HTML":<50}{kilobytes(before):>12}{kilobytes(after):>12}'
+            f'  {encoded.get("Content-Encoding", "без сжатия")}'
+        )
+        html = raw.content.decode(raw.charset)
+        for name in sorted(set(ASSET_URL.findall(html))):
+            data = read_static(name)
+            if data is None:
+                self.stdout.write(f'{name}: файл не найден')
+                continue
+            smallest = served_size(data, encodings)
+            before += len(data)
+            after += smallest
+            self.stdout.write(
+                f'{name[-50:]:<50}{kilobytes(len(data)):>12}'
+                f'{kilobytes(smallest):>12}'
+            )
+        self.stdout.write(
+            f'{"Итого":<50}{kilobytes(before):>12}{kilobytes(after):>12}'
+            f'  −{(1 - after / before) * 100:.0f}%'
+        )
+        self.stdout.write(
+            'Повторный визит (статика в кеше браузера): '
+            + kilobytes(len(encoded.content))
+        )
@@ -0,0 +1,102 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.test.utils import override_settings
+
+from core.template_backends import (profile_renders, uses_cached_loader,
+                                    warm_up)
+from posts import benchmark
+
+
+def templates_setting(cached):
+    loaders = settings.TEMPLATE_LOADERS
+    if cached:
+        loaders = [('django.template.loaders.cached.Loader', loaders)]
+    return [
+        {**backend, 'OPTIONS': {**backend['OPTIONS'], 'loaders': loaders}}
+        for backend in settings.TEMPLATES
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Время отрисовки каждого шаблона на страницах posts: общее и без '
+        'вложенных include/extends, с кешем скомпилированных шаблонов или '
+        'без него'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'names', nargs='*',
+            help='имена маршрутов posts; по умолчанию все',
+        )
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--loader', choices=('current', 'cached', 'plain'),
+            default='current',
+            help='cached — с cached.Loader, plain — чтение и разбор '
+                 'шаблонов при каждой отрисовке',
+        )
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        if options['loader'] == 'current':
+            self.profile(options)
+            return
+        cached = options['loader'] == 'cached'
+        with override_settings(TEMPLATES=templates_setting(cached)):
+            self.profile(options)
+
+    def profile(self, options):
+        started = time.perf_counter()
+        compiled = warm_up()
+        if compiled:
+            self.stdout.write(
+                f'Скомпилировано шаблонов: {compiled} за '
+                f'{(time.perf_counter() - started) * 1000:.1f} мс'
+            )
+        names = options['names'] or benchmark.route_names()
+        try:
+            targets = benchmark.find_targets()
+            calls = {
+                name: benchmark.ENDPOINTS[name](targets) for name in names
+            }
+        except benchmark.BenchmarkError as error:
+            raise CommandError(error)
+        except KeyError as error:
+            raise CommandError(f'Не описан вызов маршрута {error}')
+        clients = {name: benchmark.client_for(call)
+                   for name, call in calls.items()}
+        with profile_renders() as stats:
+            for _ in range(options['repeat']):
+                for name, call in calls.items():
+                    # Без кеша страниц и карточек отрисовывается всё
+                    cache.clear()
+                    benchmark.send(clients[name], name, call)
+        self.report(stats, options)
+
+    def report(self, stats, options):
+        cached = any(
+            uses_cached_loader(backend.engine) for backend in engines.all()
+        )
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            'cached.Loader' if cached else 'без кеша шаблонов'
+        ))
+        self.stdout.write(
+            f'{"шаблон":<40}{"раз":>7}{"всего, мс":>12}'
+            f'{"своё, мс":>12}{"среднее":>10}'
+        )
+        rows = sorted(
+            stats.items(), key=lambda item: item[1].own, reverse=True
+        )
+        for name, entry in rows[:options['limit']]:
+            self.stdout.write(
+                f'{name:<40}{entry.renders:>7}{entry.total * 1000:>12.1f}'
+                f'{entry.own * 1000:>12.1f}'
+                f'{entry.total / entry.renders * 1000:>10.2f}'
+            )
+        own = sum(entry.own for entry in stats.values())
+        self.stdout.write(f'Всего на шаблоны: {own * 1000:.1f} мс')
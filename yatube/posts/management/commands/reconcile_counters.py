@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, комментариев и подписчиков'
+
+    def handle(self, *args, **options):
+        for name, fixed in reconcile().items():
+            self.stdout.write(f'{name}: исправлено строк — {fixed}')
+        self.stdout.write(self.style.SUCCESS('Счётчики сверены'))
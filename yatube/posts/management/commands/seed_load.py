@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand
+
+from posts import seeding, transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт синтетических пользователей, группы, посты, комментарии '
+        'и подписки с неравномерным (по Ципфу) распределением для '
+        'нагрузочных тестов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=10000,
+            help='число постов; остальные объёмы по умолчанию от него',
+        )
+        for name in ('users', 'groups', 'comments', 'follows'):
+            parser.add_argument(f'--{name}', type=int)
+        parser.add_argument(
+            '--skew', type=float, default=seeding.DEFAULT_SKEW,
+            help='показатель закона Ципфа; 0 — равномерно',
+        )
+        parser.add_argument(
+            '--days', type=int, default=seeding.DEFAULT_DAYS,
+            help='за сколько дней распределить даты постов',
+        )
+        parser.add_argument(
+            '--seed', type=int,
+            help='зерно генератора для воспроизводимых данных',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=seeding.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help='не пересчитывать счётчики, ленты и поисковый индекс',
+        )
+
+    def handle(self, *args, **options):
+        amounts = seeding.volumes(options['posts'])
+        for name in amounts:
+            if options.get(name) is not None:
+                amounts[name] = options[name]
+        self.stdout.write(', '.join(
+            f'{name}: {count}' for name, count in amounts.items()
+        ))
+        seeder = seeding.Seeder(
+            skew=options['skew'],
+            seed=options['seed'],
+            days=options['days'],
+            batch_size=options['batch_size'],
+            progress=lambda name, count: self.stderr.write(
+                f'{name}: {count}'
+            ),
+        )
+        seeder.seed(**amounts, rebuild=False)
+        if not options['no_rebuild']:
+            self.stdout.write('Пересчёт счётчиков, лент и поиска')
+            transfer.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
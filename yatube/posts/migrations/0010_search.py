@@ -0,0 +1,134 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:41
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия таблицы и токенизатора из posts.search на момент миграции:
+# миграция не должна меняться вместе с кодом приложения
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'\w+')
+STOP_WORDS = frozenset(
+    'а без бы в во вот да для до же за и из или к как ко ли на над не '
+    'нет ни но о об от по под при про с со так то у что чтобы это'.split()
+)
+
+_PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+_REFLEXIVE = re.compile(r'(с[яь])$')
+_ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+_PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+_VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|((?<=[ая])(ла|на|ете|'
+    r'йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+_NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+_DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+_RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Портера."""
+    match = _RV.match(word)
+    if not match:
+        return word
+    prefix, rv = match.groups()
+    result = _PERFECTIVE_GERUND.sub('', rv, 1)
+    if result == rv:
+        rv = _REFLEXIVE.sub('', rv, 1)
+        result = _ADJECTIVE.sub('', rv, 1)
+        if result != rv:
+            rv = _PARTICIPLE.sub('', result, 1)
+        else:
+            result = _VERB.sub('', rv, 1)
+            rv = _NOUN.sub('', rv, 1) if result == rv else result
+    else:
+        rv = result
+    rv = re.sub('и$', '', rv, 1)
+    if _DERIVATIONAL.match(rv):
+        rv = re.sub('ость?$', '', rv, 1)
+    result = re.sub('ь$', '', rv, 1)
+    if result == rv:
+        rv = re.sub('ейше?$', '', rv, 1)
+        rv = re.sub('нн$', 'н', rv, 1)
+    else:
+        rv = result
+    return prefix + rv
+
+
+def tokenize(text):
+    """Основы значимых слов текста в порядке появления."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+def fts5_available(connection):
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def build_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    posts = Post.objects.only('pk', 'text').iterator()
+    if not fts5_available(connection):
+        for post in posts:
+            SearchTerm.objects.bulk_create(
+                SearchTerm(post_id=post.pk, term=term, weight=weight)
+                for term, weight in Counter(tokenize(post.text)).items()
+            )
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5('
+            f"body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        for post in posts:
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(tokenize(post.text))],
+            )
+
+
+def drop_fts_table(apps, schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=100)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(build_search_index, drop_fts_table),
+    ]
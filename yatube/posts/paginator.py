@@ -0,0 +1,257 @@
+import base64
+import datetime
+import hashlib
+import json
+import math
+
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+DEFAULT_ORDERING = ('-pub_date', '-id')
+# Сколько номеров страниц показывать вокруг текущей и у краёв списка
+PAGE_RANGE_ON_EACH_SIDE = 2
+PAGE_RANGE_ON_ENDS = 1
+# Целые в курсоре должны помещаться в 64-битное поле базы
+CURSOR_INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Значение {value!r} нельзя сохранить в курсоре')
+
+
+class CursorPaginator(Paginator):
+    """Постраничная навигация по ключу сортировки (keyset).
+
+    Переход по курсору строит запрос вида
+    ``WHERE (pub_date, id) < (...) ORDER BY ... LIMIT n`` и не зависит
+    от номера страницы. Переход по номеру (``?page=N``) сохранён для
+    совместимости и работает через OFFSET, как обычный ``Paginator``.
+    """
+
+    def __init__(self, object_list, per_page, ordering=DEFAULT_ORDERING,
+                 approximate_count=False, count_timeout=60, **kwargs):
+        self.ordering = tuple(ordering)
+        self.approximate_count = approximate_count
+        self.count_timeout = count_timeout
+        super().__init__(object_list.order_by(*self.ordering), per_page,
+                         **kwargs)
+
+    @cached_property
+    def count(self):
+        """Число объектов; в приближённом режиме берётся из кеша."""
+        if not self.approximate_count:
+            return super().count
+        query = str(self.object_list.query).encode()
+        key = 'paginator_count:' + hashlib.md5(query).hexdigest()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        """Номера страниц вокруг ``number`` и у краёв, пропуски — ELLIPSIS.
+
+        Как ``Paginator.get_elided_page_range`` из Django 3.2, но номер
+        вне диапазона приводится к ближайшей странице: номер страницы по
+        курсору при приближённом числе постов может его превышать.
+        """
+        number = min(max(int(number), 1), self.num_pages)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > on_each_side + on_ends + 2:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < self.num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - on_ends + 1, self.num_pages + 1)
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+    def get_page(self, number=None, cursor=None):
+        """Страница по курсору, а при его отсутствии — по номеру."""
+        if cursor:
+            try:
+                values, direction, number = self.decode_cursor(cursor)
+            except ValueError:
+                pass
+            else:
+                return self.page_from_cursor(values, direction, number)
+        return super().get_page(number)
+
+    def cursor_page(self, cursor=None):
+        """Страница по курсору, а без него или с испорченным — первая.
+
+        В отличие от ``get_page`` никогда не считает COUNT и не
+        переходит по номеру страницы.
+        """
+        if cursor:
+            try:
+                values, direction, number = self.decode_cursor(cursor)
+            except ValueError:
+                pass
+            else:
+                return self.page_from_cursor(values, direction, number)
+        return self.first_page()
+
+    def first_page(self):
+        """Первая страница без запроса COUNT."""
+        rows = list(self.object_list[:self.per_page + 1])
+        return CursorPage(rows[:self.per_page], 1, self,
+                          has_next=len(rows) > self.per_page,
+                          has_previous=False)
+
+    def page_from_cursor(self, values, direction, number):
+        backwards = direction == 'prev'
+        queryset = self.object_list.filter(
+            self._keyset_filter(values, backwards)
+        )
+        if backwards:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            number = max(number, 1) if has_more else 1
+            has_next = True
+            has_previous = has_more
+        else:
+            has_next = has_more
+            has_previous = True
+        return CursorPage(rows, number, self, has_next=has_next,
+                          has_previous=has_previous)
+
+    def _get_page(self, *args, **kwargs):
+        return CursorPage(*args, **kwargs)
+
+    def _keyset_filter(self, values, backwards):
+        names = [field.lstrip('-') for field in self.ordering]
+        condition = Q()
+        for index, field in enumerate(self.ordering):
+            descending = field.startswith('-')
+            lookup = 'lt' if descending != backwards else 'gt'
+            branch = Q(**{f'{names[index]}__{lookup}': values[index]})
+            for name, value in zip(names[:index], values[:index]):
+                branch &= Q(**{name: value})
+            condition |= branch
+        return condition
+
+    def encode_cursor(self, obj, direction, number):
+        values = [getattr(obj, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps(
+            {'k': values, 'd': direction, 'n': number},
+            default=_encode_value, separators=(',', ':'),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padding = '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            values, direction = payload['k'], payload['d']
+            number = int(payload['n'])
+        except (TypeError, KeyError, ValueError, OverflowError):
+            raise ValueError('Некорректный курсор')
+        if direction not in ('next', 'prev'):
+            raise ValueError('Некорректный курсор')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise ValueError('Некорректный курсор')
+        return self._to_python(values), direction, number
+
+    def _to_python(self, values):
+        converted = []
+        for field, value in zip(self.ordering, values):
+            # В курсоре бывают только строки дат, id и ранги поиска
+            if isinstance(value, bool) or not isinstance(
+                value, (str, int, float)
+            ):
+                raise ValueError('Некорректный курсор')
+            if isinstance(value, int) and value not in CURSOR_INT_RANGE:
+                raise ValueError('Некорректный курсор')
+            if isinstance(value, float) and not math.isfinite(value):
+                raise ValueError('Некорректный курсор')
+            try:
+                value = self._field(field.lstrip('-')).to_python(value)
+            except (ValidationError, TypeError, OverflowError):
+                raise ValueError('Некорректный курсор')
+            if value is None:
+                raise ValueError('Некорректный курсор')
+            converted.append(value)
+        return converted
+
+    def _field(self, name):
+        query = self.object_list.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        try:
+            return query.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError('Некорректный курсор')
+
+
+class CursorPage(Page):
+    """Страница, совместимая с шаблонами ``Page``, с курсорами соседей."""
+
+    def __init__(self, object_list, number, paginator,
+                 has_next=None, has_previous=None):
+        super().__init__(object_list, number, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        if self._has_next is None:
+            return super().has_next()
+        return self._has_next
+
+    def has_previous(self):
+        if self._has_previous is None:
+            return super().has_previous()
+        return self._has_previous
+
+    def next_page_number(self):
+        if self._has_next is None:
+            return super().next_page_number()
+        return self.number + 1
+
+    def previous_page_number(self):
+        if self._has_previous is None:
+            return super().previous_page_number()
+        return max(self.number - 1, 1)
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next() or not len(self):
+            return None
+        return self.paginator.encode_cursor(
+            self[-1], 'next', self.number + 1
+        )
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous() or not len(self):
+            return None
+        return self.paginator.encode_cursor(
+            self[0], 'prev', self.number - 1
+        )
+
+    @cached_property
+    def elided_page_range(self):
+        """Номера страниц для навигации: не больше десятка при любом числе."""
+        return list(self.paginator.get_elided_page_range(
+            self.number,
+            on_each_side=PAGE_RANGE_ON_EACH_SIDE,
+            on_ends=PAGE_RANGE_ON_ENDS,
+        ))
@@ -0,0 +1,173 @@
+"""Полнотекстовый поиск по постам.
+
+Текст поста разбивается на слова, из которых убираются стоп-слова, а
+оставшиеся приводятся к основе стеммером Портера для русского языка.
+Основы хранятся в виртуальной таблице SQLite FTS5 ``posts_post_fts``,
+а если FTS5 недоступен (другая СУБД или SQLite без расширения) — в
+обратном индексе ``SearchTerm``. Результаты ранжируются: FTS5 — по
+BM25, обратный индекс — по числу вхождений слов запроса.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, F, FloatField, Q, Sum, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+SEARCH_ORDERING = ('-search_rank', '-id')
+
+WORD_RE = re.compile(r'\w+')
+STOP_WORDS = frozenset(
+    'а без бы в во вот да для до же за и из или к как ко ли на над не '
+    'нет ни но о об от по под при про с со так то у что чтобы это'.split()
+)
+
+_PERFECTIVE_GERUND = re.compile(
+    r'((ив|ивши|ившись|ыв|ывши|ывшись)|((?<=[ая])(в|вши|вшись)))$'
+)
+_REFLEXIVE = re.compile(r'(с[яь])$')
+_ADJECTIVE = re.compile(
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому|их|ых|'
+    r'ую|юю|ая|яя|ою|ею)$'
+)
+_PARTICIPLE = re.compile(r'((ивш|ывш|ующ)|((?<=[ая])(ем|нн|вш|ющ|щ)))$')
+_VERB = re.compile(
+    r'((ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило|ыло|'
+    r'ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю)|((?<=[ая])(ла|на|ете|'
+    r'йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)))$'
+)
+_NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием|ем|'
+    r'ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+_DERIVATIONAL = re.compile(r'.*[^аеиоуыэюя]+[аеиоуыэюя].*ость?$')
+_RV = re.compile(r'^(.*?[аеиоуыэюя])(.*)$')
+
+
+def stem(word):
+    """Основа русского слова по алгоритму Портера."""
+    match = _RV.match(word)
+    if not match:
+        return word
+    prefix, rv = match.groups()
+    result = _PERFECTIVE_GERUND.sub('', rv, 1)
+    if result == rv:
+        rv = _REFLEXIVE.sub('', rv, 1)
+        result = _ADJECTIVE.sub('', rv, 1)
+        if result != rv:
+            rv = _PARTICIPLE.sub('', result, 1)
+        else:
+            result = _VERB.sub('', rv, 1)
+            rv = _NOUN.sub('', rv, 1) if result == rv else result
+    else:
+        rv = result
+    rv = re.sub('и$', '', rv, 1)
+    if _DERIVATIONAL.match(rv):
+        rv = re.sub('ость?$', '', rv, 1)
+    result = re.sub('ь$', '', rv, 1)
+    if result == rv:
+        rv = re.sub('ейше?$', '', rv, 1)
+        rv = re.sub('нн$', 'н', rv, 1)
+    else:
+        rv = result
+    return prefix + rv
+
+
+def tokenize(text):
+    """Основы значимых слов текста в порядке появления."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+@lru_cache()
+def _fts_table_exists(database):
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def use_fts():
+    """Использовать ли FTS5: ``SEARCH_BACKEND`` = ``'fts5'``,
+    ``'inverted'`` или ``'auto'`` (FTS5, если таблица создана)."""
+    backend = settings.SEARCH_BACKEND
+    if backend != 'auto':
+        return backend == 'fts5'
+    return _fts_table_exists(connection.settings_dict['NAME'])
+
+
+def index_post(post):
+    terms = tokenize(post.text)
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post.pk, ' '.join(terms)],
+            )
+        return
+    SearchTerm.objects.filter(post=post).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(post=post, term=term, weight=weight)
+        for term, weight in Counter(terms).items()
+    )
+
+
+def remove_post(post_id):
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+                           [post_id])
+    # Строки SearchTerm удаляются каскадно вместе с постом
+
+
+def rebuild(post_ids=None):
+    """Переиндексирует заданные (или все) посты."""
+    posts = Post.objects.only('pk', 'text')
+    if post_ids is not None:
+        # index_post сам заменяет прежние строки поста
+        posts = posts.filter(pk__in=post_ids)
+    elif use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchTerm.objects.all().delete()
+    for post in posts.iterator():
+        index_post(post)
+
+
+def _match_expression(terms):
+    return ' AND '.join(f'"{term}"' for term in terms)
+
+
+def search(query, queryset=None):
+    """Посты, содержащие все слова запроса, с оценкой ``search_rank``."""
+    if queryset is None:
+        queryset = Post.objects.all()
+    terms = sorted(set(tokenize(query)))
+    if not terms:
+        return queryset.annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        ).none()
+    if use_fts():
+        match = _match_expression(terms)
+        # RawSQL в pk__in оборачивается в скобки и становится скалярным
+        # подзапросом, поэтому условие задаётся через extra()
+        return queryset.extra(where=[
+            f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s)'
+        ], params=[match]).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = posts_post.id',
+            [match],
+            output_field=FloatField(),
+        ))
+    return queryset.filter(
+        search_terms__term__in=terms
+    ).annotate(
+        matched=Count('search_terms', filter=Q(search_terms__term__in=terms)),
+        search_rank=Sum(F('search_terms__weight'), output_field=FloatField()),
+    ).filter(matched=len(terms))
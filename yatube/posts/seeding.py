@@ -0,0 +1,208 @@
+"""Синтетические данные для нагрузочных тестов.
+
+Объёмы распределены неравномерно, как на живом сайте: авторы, группы,
+обсуждаемые посты и популярные для подписки пользователи выбираются по
+закону Ципфа — вес k-го по популярности равен ``1 / k ** skew``. Поэтому
+у немногих авторов тысячи постов и подписчиков, а у большинства — единицы.
+Даты постов сгущаются к настоящему времени.
+
+Записи создаются пачками ``bulk_create`` без сигналов, после чего
+счётчики, ленты и поисковый индекс пересчитываются целиком.
+"""
+import itertools
+import random
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+
+from . import transfer
+from .models import Comment, Follow, Group, Post, User
+
+USERNAME_PREFIX = 'load_'
+GROUP_SLUG_PREFIX = 'load-group-'
+DEFAULT_SKEW = 1.1
+DEFAULT_DAYS = 365
+BATCH_SIZE = 1000
+# Доля постов без группы
+UNGROUPED = 0.3
+
+
+def volumes(posts):
+    """Объёмы остальных моделей, соразмерные числу постов."""
+    users = max(posts // 10, 2)
+    return {
+        'users': users,
+        'groups': max(posts // 200, 1),
+        'posts': posts,
+        'comments': posts * 2,
+        'follows': users * 5,
+    }
+
+
+def zipf_weights(count, skew):
+    return list(itertools.accumulate(
+        1 / rank ** skew for rank in range(1, count + 1)
+    ))
+
+
+class Seeder:
+    def __init__(self, skew=DEFAULT_SKEW, seed=None, days=DEFAULT_DAYS,
+                 batch_size=BATCH_SIZE, progress=None):
+        self.skew = skew
+        self.days = days
+        self.batch_size = batch_size
+        self.progress = progress or (lambda name, count: None)
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.now = timezone.now()
+
+    def pick(self, population, weights, count):
+        """Выбор с повторениями; ``weights`` — накопленные веса Ципфа."""
+        return self.random.choices(population, cum_weights=weights, k=count)
+
+    def past_date(self, after=None):
+        # Квадрат равномерной величины сгущает даты к настоящему
+        start = after or self.now - timedelta(days=self.days)
+        span = (self.now - start).total_seconds()
+        return self.now - timedelta(seconds=span * self.random.random() ** 2)
+
+    def text(self, sentences):
+        # Длина текста с тяжёлым хвостом: обычно пара предложений
+        count = min(int(self.random.paretovariate(1.5)) * sentences, 50)
+        return self.fake.paragraph(nb_sentences=count)
+
+    def create(self, model, objects):
+        created = 0
+        objects = iter(objects)
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                return
+            with transaction.atomic():
+                transfer.bulk_create_with_dates(
+                    model, batch, ignore_conflicts=True
+                )
+            created += len(batch)
+            self.progress(model._meta.model_name, created)
+
+    def new_ids(self, model, after):
+        return list(model.objects.filter(pk__gt=after).order_by(
+            'pk'
+        ).values_list('pk', flat=True))
+
+    def last_id(self, model):
+        return model.objects.aggregate(last=Max('pk'))['last'] or 0
+
+    def seed_users(self, count):
+        start = User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).count()
+        password = make_password(None)
+        after = self.last_id(User)
+        self.create(User, (
+            User(
+                username=f'{USERNAME_PREFIX}{number}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                password=password,
+            )
+            for number in range(start, start + count)
+        ))
+        return self.new_ids(User, after)
+
+    def seed_groups(self, count):
+        start = Group.objects.filter(
+            slug__startswith=GROUP_SLUG_PREFIX
+        ).count()
+        after = self.last_id(Group)
+        self.create(Group, (
+            Group(
+                title=self.fake.sentence(nb_words=3).rstrip('.'),
+                slug=f'{GROUP_SLUG_PREFIX}{number}',
+                description=self.fake.paragraph(),
+            )
+            for number in range(start, start + count)
+        ))
+        return self.new_ids(Group, after)
+
+    def seed_posts(self, count, user_ids, group_ids):
+        after = self.last_id(Post)
+        authors = self.pick(
+            user_ids, zipf_weights(len(user_ids), self.skew), count
+        )
+        groups = self.pick(
+            group_ids, zipf_weights(len(group_ids), self.skew), count
+        ) if group_ids else [None] * count
+        # Явные id нужны, чтобы вернуть даты после auto_now_add
+        self.create(Post, (
+            Post(
+                id=after + number,
+                author_id=author_id,
+                group_id=(
+                    None if self.random.random() < UNGROUPED else group_id
+                ),
+                text=self.text(sentences=2),
+                pub_date=self.past_date(),
+            )
+            for number, (author_id, group_id) in enumerate(
+                zip(authors, groups), start=1
+            )
+        ))
+        return self.new_ids(Post, after)
+
+    def seed_comments(self, count, user_ids, post_ids):
+        # Обсуждаемость постов не связана с их возрастом
+        post_ids = self.random.sample(post_ids, len(post_ids))
+        posts = self.pick(
+            post_ids, zipf_weights(len(post_ids), self.skew), count
+        )
+        dates = dict(Post.objects.filter(pk__in=set(posts)).values_list(
+            'pk', 'pub_date'
+        ))
+        after = self.last_id(Comment)
+        self.create(Comment, (
+            Comment(
+                id=after + number,
+                post_id=post_id,
+                author_id=self.random.choice(user_ids),
+                text=self.text(sentences=1),
+                created=self.past_date(after=dates[post_id]),
+            )
+            for number, post_id in enumerate(posts, start=1)
+        ))
+
+    def seed_follows(self, count, user_ids):
+        # Популярные авторы — те же, что пишут больше всех
+        authors = self.pick(
+            user_ids, zipf_weights(len(user_ids), self.skew), count
+        )
+        pairs = {
+            (self.random.choice(user_ids), author_id)
+            for author_id in authors
+        }
+        self.create(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+            if user_id != author_id
+        ))
+
+    def seed(self, users, groups, posts, comments, follows, rebuild=True):
+        user_ids = self.seed_users(users)
+        group_ids = self.seed_groups(groups)
+        post_ids = (
+            self.seed_posts(posts, user_ids, group_ids)
+            if user_ids else []
+        )
+        if post_ids:
+            self.seed_comments(comments, user_ids, post_ids)
+        if len(user_ids) > 1:
+            self.seed_follows(follows, user_ids)
+        if rebuild:
+            transfer.rebuild_derived()
+        else:
+            transfer.reset_sequences()
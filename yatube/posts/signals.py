@@ -0,0 +1,94 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from core.cache import bump_generation
+from . import counters, fragments, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+from .fragments import FEED_GENERATION
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_cards(sender, instance, **kwargs):
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        return
+    fragments.bump_version('author', instance.pk)
+    bump_generation(FEED_GENERATION)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_card(sender, instance, **kwargs):
+    fragments.bump_version('post', instance.pk)
+    bump_generation(FEED_GENERATION)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_group_cards(sender, instance, **kwargs):
+    fragments.bump_version('group', instance.pk)
+    bump_generation(FEED_GENERATION)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_feed(sender, instance, **kwargs):
+    bump_generation(FEED_GENERATION)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user_stats(instance.author_id, 'posts_count', 1)
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or 'text' in update_fields:
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_post(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.bump_user_stats(instance.author_id, 'posts_count', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_comments_count(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.bump_comments_count(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def add_followed_author(sender, instance, created, **kwargs):
+    if created:
+        counters.bump_user_stats(instance.author_id, 'followers_count', 1)
+        counters.bump_user_stats(instance.user_id, 'following_count', 1)
+        timeline.mark_pull_author(instance.author_id)
+        timeline.add_author(instance.user_id, instance.author_id)
+        bump_generation(timeline.generation_name(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def remove_followed_author(sender, instance, **kwargs):
+    counters.bump_user_stats(instance.author_id, 'followers_count', -1)
+    counters.bump_user_stats(instance.user_id, 'following_count', -1)
+    timeline.remove_author(instance.user_id, instance.author_id)
+    bump_generation(timeline.generation_name(instance.user_id))
@@ -0,0 +1,32 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import images, thumbnails
+from posts.fragments import prefetch_cards, render_card
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_card(post, geometry='960x339', show_group=True):
+    """Карточка поста для лент; отрисовка кешируется по версии поста."""
+    return mark_safe(
+        render_card(post, geometry=geometry, show_group=show_group)
+    )
+
+
+@register.simple_tag
+def prefetch_post_cards(posts, geometry='960x339', show_group=True):
+    """Загружает из кеша все карточки страницы одним запросом, а для
+    неотрисованных — миниатюры картинок."""
+    missing = prefetch_cards(posts, geometry=geometry, show_group=show_group)
+    thumbnails.prefetch(
+        [post.image for post in missing if post.image], geometry
+    )
+    return ''
+
+
+@register.simple_tag
+def post_image_sources(post):
+    """Готовые WebP/AVIF-варианты картинки для ``<picture>``."""
+    return images.sources(post)
@@ -0,0 +1,112 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Follow, Group, Post, User
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Группа", slug="group", description="Описание"
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f"Пост {number}"
+            )
+            for number in range(13)
+        ]
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds(self):
+        """Ленты API отдают те же посты, что и HTML-страницы"""
+        urls = [
+            reverse("posts:api_index"),
+            reverse("posts:api_group_posts", args=[self.group.slug]),
+            reverse("posts:api_profile", args=[self.author.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                data = self.guest_client.get(url).json()
+                self.assertEqual(len(data["results"]), 10)
+                self.assertEqual(data["results"][0]["id"], self.posts[-1].id)
+                self.assertEqual(data["results"][0]["author"], "author")
+                self.assertEqual(data["results"][0]["group"], "group")
+
+    def test_cursor_pagination(self):
+        """Ссылка next ведёт на следующую страницу ленты"""
+        first = self.guest_client.get(reverse("posts:api_index")).json()
+        second = self.guest_client.get(first["next"]).json()
+        ids = [post["id"] for post in first["results"] + second["results"]]
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)])
+        self.assertIsNone(second["next"])
+
+    def test_broken_cursor_returns_first_page(self):
+        """Испорченный курсор отдаёт первую страницу одним запросом"""
+        with self.assertNumQueries(1):
+            data = self.guest_client.get(
+                reverse("posts:api_index"), {"cursor": "broken"}
+            ).json()
+        self.assertEqual(
+            [post["id"] for post in data["results"]],
+            [post.id for post in reversed(self.posts[3:])],
+        )
+        self.assertIsNotNone(data["next"])
+
+    def test_post_detail(self):
+        """Пост отдаётся со ссылкой на комментарии"""
+        post = self.posts[0]
+        data = self.guest_client.get(
+            reverse("posts:api_post_detail", args=[post.id])
+        ).json()
+        self.assertEqual(data["text"], post.text)
+        self.assertEqual(
+            data["comments"],
+            reverse("posts:post_comments", args=[post.id]) + "?format=json",
+        )
+
+    def test_follow_feed(self):
+        """Лента подписок требует авторизации"""
+        url = reverse("posts:api_follow_index")
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(data["results"][0]["id"], self.posts[-1].id)
+
+    def test_not_modified_without_queries(self):
+        """Повторный запрос с ETag получает 304 без запросов к БД"""
+        url = reverse("posts:api_index")
+        response = self.guest_client.get(url)
+        self.assertTrue(response.has_header("Last-Modified"))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_on_edit(self):
+        """Правка поста меняет ETag"""
+        url = reverse("posts:api_index")
+        etag = self.guest_client.get(url)["ETag"]
+        post = Post.objects.get(pk=self.posts[0].pk)
+        post.text = "Исправленный пост"
+        post.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_etag_changes_on_unfollow(self):
+        """Отписка меняет ETag ленты подписок"""
+        url = reverse("posts:api_follow_index")
+        etag = self.reader_client.get(url)["ETag"]
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [])
@@ -0,0 +1,161 @@
+import asyncio
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase
+
+from core.asgi import (RESPONSE_CHUNK_SIZE, RESPONSE_QUEUE_SIZE, ASGIHandler,
+                       build_environ)
+from ..models import Post
+
+User = get_user_model()
+
+
+class InlineExecutor(Executor):
+    """Выполняет запрос в потоке теста, чтобы видеть его транзакцию."""
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class ASGIHandlerTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.post = Post.objects.create(author=cls.user, text="Пост через ASGI")
+
+    def setUp(self):
+        self.application = ASGIHandler(executor=InlineExecutor())
+
+    def request(self, path, query=b"", **extra):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": path,
+            "query_string": query,
+            "headers": [(b"host", b"testserver")],
+            **extra,
+        }
+        asyncio.run(self.application(scope, receive, send))
+        return messages[0]["status"], b"".join(m["body"] for m in messages[1:])
+
+    def test_feed_pages_are_served(self):
+        """Ленты отдаются через ASGI-обработчик"""
+        pages = [
+            "/",
+            f"/profile/{self.user.username}/",
+            f"/posts/{self.post.pk}/",
+        ]
+        for path in pages:
+            with self.subTest(path=path):
+                status, body = self.request(path)
+                self.assertEqual(status, 200)
+                self.assertIn(self.post.text, body.decode())
+
+    def test_missing_page(self):
+        """Несуществующая страница возвращает 404"""
+        status, _ = self.request("/group/missing/")
+        self.assertEqual(status, 404)
+
+    def test_non_ascii_path(self):
+        """Путь берётся декодированным, а не из raw_path"""
+        User.objects.create_user(username="егор")
+        status, body = self.request(
+            "/profile/егор/",
+            raw_path=b"/profile/%D0%B5%D0%B3%D0%BE%D1%80/",
+        )
+        self.assertEqual(status, 200)
+        self.assertIn("егор", body.decode())
+
+    def test_root_path_is_script_name(self):
+        """Префикс root_path переходит в SCRIPT_NAME, а не в PATH_INFO"""
+        scope = {
+            "type": "http",
+            "method": "GET",
+            "path": "/yatube/profile/auth/",
+            "root_path": "/yatube",
+        }
+        environ = build_environ(scope, None)
+        self.assertEqual(environ["SCRIPT_NAME"], "/yatube")
+        self.assertEqual(environ["PATH_INFO"], "/profile/auth/")
+
+    def test_environ_headers(self):
+        """Заголовки и строка запроса переходят в WSGI-окружение"""
+        scope = {
+            "type": "http",
+            "method": "POST",
+            "path": "/create/",
+            "query_string": b"page=2",
+            "headers": [
+                (b"content-type", b"text/plain"),
+                (b"accept", b"text/html"),
+                (b"accept", b"*/*"),
+            ],
+        }
+        environ = build_environ(scope, None)
+        self.assertEqual(environ["PATH_INFO"], "/create/")
+        self.assertEqual(environ["QUERY_STRING"], "page=2")
+        self.assertEqual(environ["CONTENT_TYPE"], "text/plain")
+        self.assertEqual(environ["HTTP_ACCEPT"], "text/html,*/*")
+
+
+class ASGIStreamingTests(SimpleTestCase):
+    CHUNKS = 50
+
+    def setUp(self):
+        self.produced = []
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.executor.shutdown)
+        self.handler = ASGIHandler(self.application, self.executor)
+
+    def application(self, environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/plain")])
+        for number in range(self.CHUNKS):
+            self.produced.append(number)
+            yield b"x" * RESPONSE_CHUNK_SIZE
+
+    def serve(self, send):
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        scope = {"type": "http", "method": "GET", "path": "/file"}
+        asyncio.run(self.handler(scope, receive, send))
+
+    def test_large_response_is_streamed(self):
+        """Большой ответ отправляется по мере чтения, а не целиком"""
+        bodies, ahead = [], []
+
+        async def send(message):
+            if message["type"] == "http.response.body":
+                ahead.append(len(self.produced) - len(bodies))
+                bodies.append(message)
+                await asyncio.sleep(0)
+
+        self.serve(send)
+        self.assertEqual(
+            sum(len(message["body"]) for message in bodies),
+            self.CHUNKS * RESPONSE_CHUNK_SIZE,
+        )
+        self.assertFalse(bodies[-1].get("more_body", False))
+        self.assertLessEqual(max(ahead), RESPONSE_QUEUE_SIZE + 2)
+
+    def test_disconnect_stops_response(self):
+        """После отключения клиента поток перестаёт читать ответ"""
+        async def send(message):
+            if message["type"] == "http.response.body":
+                raise OSError("клиент отключился")
+
+        with self.assertRaises(OSError):
+            self.serve(send)
+        self.assertLess(len(self.produced), self.CHUNKS)
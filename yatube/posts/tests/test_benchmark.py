@@ -0,0 +1,113 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from .. import benchmark
+from ..models import Comment, Follow, Group, Post, User, UserStats
+
+
+class SeedLoadTests(TestCase):
+    def call(self, *args, **options):
+        call_command(
+            "seed_load", *args, stdout=io.StringIO(), stderr=io.StringIO(),
+            **options
+        )
+
+    def test_volumes(self):
+        """seed_load создаёт заданные объёмы и пересчитывает счётчики"""
+        self.call(posts=200, users=20, groups=3, comments=300, seed=1)
+        self.assertEqual(User.objects.count(), 20)
+        self.assertEqual(Group.objects.count(), 3)
+        self.assertEqual(Post.objects.count(), 200)
+        self.assertEqual(Comment.objects.count(), 300)
+        self.assertTrue(Follow.objects.exists())
+        post = Post.objects.order_by("-comments_count").first()
+        self.assertEqual(post.comments_count, post.comments.count())
+        self.assertTrue(all(
+            comment.created >= post.pub_date
+            for comment in post.comments.all()
+        ))
+
+    def test_skew(self):
+        """Посты распределены по авторам неравномерно"""
+        self.call(posts=500, users=50, seed=1)
+        counts = sorted(
+            UserStats.objects.values_list("posts_count", flat=True),
+            reverse=True,
+        )
+        self.assertGreater(counts[0], counts[len(counts) // 2] * 5)
+
+    def test_repeated_runs_add_data(self):
+        """Повторный запуск дополняет данные, а не конфликтует с ними"""
+        self.call(posts=50, seed=1)
+        self.call(posts=50, seed=1)
+        self.assertEqual(Post.objects.count(), 100)
+        self.assertEqual(User.objects.count(), 10)
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_load", posts=30, seed=1,
+            stdout=io.StringIO(), stderr=io.StringIO(),
+        )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def call(self, *args, **options):
+        output = io.StringIO()
+        call_command(
+            "benchmark", *args, repeat=2, stdout=output,
+            stderr=io.StringIO(), **options
+        )
+        return output.getvalue()
+
+    def test_report_covers_all_routes(self):
+        """Отчёт содержит замеры каждого маршрута posts"""
+        path = os.path.join(self.directory, "report.json")
+        self.call(output=path)
+        with open(path, encoding="utf-8") as report:
+            run, = json.load(report)["runs"]
+        self.assertEqual(set(run["endpoints"]), set(benchmark.route_names()))
+        self.assertEqual(run["size"], 30)
+        for name, metrics in run["endpoints"].items():
+            self.assertLess(metrics["status"], 400, name)
+            self.assertGreater(metrics["rps"], 0, name)
+
+    def test_write_routes_rolled_back(self):
+        """Замеры записывающих маршрутов не меняют данные"""
+        counts = benchmark.data_counts()
+        self.call("add_comment", "profile_follow", "profile_unfollow")
+        self.assertEqual(benchmark.data_counts(), counts)
+
+    def test_compare_reports_regressions(self):
+        """Рост числа запросов при сравнении считается ухудшением"""
+        path = os.path.join(self.directory, "baseline.json")
+        self.call("post_detail", output=path)
+        with open(path, encoding="utf-8") as report:
+            baseline = json.load(report)
+        metrics = baseline["runs"][0]["endpoints"]["post_detail"]
+        metrics["queries_warm"] -= 1
+        with open(path, "w", encoding="utf-8") as report:
+            json.dump(baseline, report)
+        with self.assertRaises(CommandError):
+            self.call(
+                "post_detail", compare=path, threshold=1000,
+                fail_on_regression=True,
+            )
+
+    def test_unknown_route(self):
+        """Маршрут без описания вызова — ошибка, а не пропуск"""
+        with self.assertRaises(CommandError):
+            self.call("no_such_route")
@@ -0,0 +1,119 @@
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from core.cache_backends import TwoTierCache
+
+
+class TwoTierCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.journal_dir = tempfile.mkdtemp()
+        caches["shared"].clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.journal_dir, ignore_errors=True)
+        caches["shared"].clear()
+
+    def make_cache(self, **options):
+        return TwoTierCache("", {"OPTIONS": {
+            "SHARED": "shared",
+            "JOURNAL": f"{self.journal_dir}/invalidations.log",
+            "JOURNAL_POLL": 0,
+            **options,
+        }})
+
+    def test_local_tier_serves_repeated_reads(self):
+        """Повторное чтение не обращается к общему кешу"""
+        cache = self.make_cache()
+        cache.set("key", "value")
+        caches["shared"].delete("key")
+        self.assertEqual(cache.get("key"), "value")
+
+    def test_write_invalidates_other_workers(self):
+        """Запись одного воркера очищает память других"""
+        first, second = self.make_cache(), self.make_cache()
+        first.set("key", "old")
+        self.assertEqual(second.get("key"), "old")
+        first.set("key", "new")
+        self.assertEqual(second.get("key"), "new")
+        first.delete("key")
+        self.assertIsNone(second.get("key"))
+
+    def test_clear_invalidates_other_workers(self):
+        """Очистка кеша сбрасывает память всех воркеров"""
+        first, second = self.make_cache(), self.make_cache()
+        first.set("key", "value")
+        second.get("key")
+        first.clear()
+        self.assertIsNone(second.get("key"))
+
+    def test_rotated_journal_clears_local_tier(self):
+        """После смены файла журнала память воркера сбрасывается"""
+        first = self.make_cache(JOURNAL_MAX_BYTES=0)
+        second = self.make_cache()
+        first.set("key", "value")
+        second.get("key")
+        caches["shared"].set("key", "changed")
+        first.set("other", "value")
+        self.assertEqual(second.get("key"), "changed")
+
+    def test_local_tier_respects_shared_timeout(self):
+        """Другой воркер держит значение не дольше, чем общий кеш"""
+        first, second = self.make_cache(), self.make_cache()
+        first.set("index_page:x", "value", 1)
+        self.assertEqual(second.get_many(["index_page:x"]), {
+            "index_page:x": "value"
+        })
+        # Общий кеш забыл значение по сроку, без записи в журнал
+        caches["shared"].delete("index_page:x")
+        later = time.monotonic() + 2
+        with mock.patch("core.cache_backends.time.monotonic",
+                        return_value=later):
+            self.assertIsNone(second.get("index_page:x"))
+
+    def test_value_without_expiry_not_kept_locally(self):
+        """Значение, записанное в общий кеш напрямую, не кешируется в памяти"""
+        cache = self.make_cache()
+        caches["shared"].set("key", "raw")
+        self.assertEqual(cache.get("key"), "raw")
+        caches["shared"].delete("key")
+        self.assertIsNone(cache.get("key"))
+
+    def test_touch_and_incr(self):
+        """touch и incr работают со значениями обоих уровней"""
+        cache = self.make_cache(PREFIXES={"counter:": {"local": False}})
+        cache.set("key", 1, 1)
+        self.assertTrue(cache.touch("key", None))
+        self.assertIsNone(caches["shared"].get("key").expires)
+        self.assertEqual(cache.incr("key"), 2)
+        cache.add("counter:key", 0)
+        self.assertEqual(cache.incr("counter:key", 5), 5)
+        self.assertEqual(caches["shared"].get("counter:key"), 5)
+
+    def test_prefix_policies(self):
+        """Префиксы задают срок и ограничения хранения в памяти"""
+        cache = self.make_cache(PREFIXES={
+            "shared_only:": {"local": False},
+            "small:": {"max_size": 10},
+            "short:": {"timeout": 1},
+        })
+        cache.set("shared_only:key", "value")
+        cache.set("small:key", "x" * 100)
+        cache.set("short:key", "value")
+        caches["shared"].clear()
+        self.assertIsNone(cache.get("shared_only:key"))
+        self.assertIsNone(cache.get("small:key"))
+        self.assertEqual(cache.get("short:key"), "value")
+
+    def test_local_tier_is_bounded(self):
+        """Память процесса вытесняет давно не читавшиеся ключи"""
+        cache = self.make_cache(LOCAL_MAX_ENTRIES=2)
+        cache.set_many({"a": 1, "b": 2})
+        cache.get("a")
+        cache.set("c", 3)
+        caches["shared"].clear()
+        self.assertEqual(cache.get_many(["a", "b", "c"]), {"a": 1, "c": 3})
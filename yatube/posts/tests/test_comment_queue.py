@@ -0,0 +1,108 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .. import comment_queue
+from ..models import Comment, Post, User
+
+SPOOL_DIR = tempfile.mkdtemp()
+
+
+@override_settings(
+    COMMENT_WRITE_BEHIND=True,
+    COMMENT_FLUSH_INTERVAL=None,
+    COMMENT_FLUSH_SIZE=3,
+    COMMENT_SPOOL_DIR=SPOOL_DIR,
+)
+class CommentQueueTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(SPOOL_DIR, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.post = Post.objects.create(author=cls.author, text="Пост")
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(comment_queue.shutdown)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def comment(self, text):
+        self.reader_client.post(
+            reverse("posts:add_comment", args=[self.post.pk]),
+            {"text": text},
+        )
+
+    def spool_files(self):
+        return os.listdir(SPOOL_DIR)
+
+    def test_comment_queued_and_flushed(self):
+        """Комментарий пишется в журнал, а в базу — при сбросе очереди"""
+        self.comment("Отложенный")
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(len(self.spool_files()), 1)
+        self.assertEqual(comment_queue.get_queue().flush(), 1)
+        self.assertEqual(self.post.comments.get().text, "Отложенный")
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        self.assertEqual(self.spool_files(), [])
+
+    def test_flush_by_size(self):
+        """Очередь сбрасывается, когда набирается COMMENT_FLUSH_SIZE"""
+        for number in range(3):
+            self.comment(f"Комментарий {number}")
+        self.assertEqual(Comment.objects.count(), 3)
+
+    def test_author_sees_pending_comment(self):
+        """Автор сразу видит свой комментарий, остальные — после записи"""
+        url = reverse("posts:post_detail", args=[self.post.pk])
+        self.comment("Ещё в очереди")
+        self.assertContains(self.reader_client.get(url), "Ещё в очереди")
+        self.assertNotContains(Client().get(url), "Ещё в очереди")
+        comment_queue.get_queue().flush()
+        response = self.reader_client.get(url)
+        self.assertContains(response, "Ещё в очереди", count=1)
+
+    def test_pending_comments_of_parallel_processes_kept(self):
+        """Комментарии из разных процессов не затирают друг друга"""
+        queues = [
+            comment_queue.CommentQueue(SPOOL_DIR, 10, None) for _ in range(2)
+        ]
+        self.addCleanup(lambda: [queue.flush() for queue in queues])
+        for number, queue in enumerate(queues):
+            queue.enqueue(Comment(
+                post=self.post, author=self.reader, text=f"Процесс {number}"
+            ))
+        pending = comment_queue.pending_comments(self.post, self.reader)
+        self.assertEqual(
+            [comment.text for comment in pending], ["Процесс 1", "Процесс 0"]
+        )
+
+    def test_recover_spool_of_dead_process(self):
+        """Журнал упавшего процесса дописывается один раз"""
+        record = {
+            "post": self.post.pk,
+            "author": self.reader.pk,
+            "text": "Из журнала",
+            "created": timezone.now().isoformat(),
+        }
+        path = os.path.join(SPOOL_DIR, "comments-1-dead.jsonl")
+        for _ in range(2):
+            with open(path, "w", encoding="utf-8") as spool:
+                spool.write(json.dumps(record) + "\n" + '{"post": ')
+            call_command("flush_comment_spool", stdout=io.StringIO())
+            self.assertFalse(os.path.exists(path))
+        self.assertEqual(self.post.comments.get().text, "Из журнала")
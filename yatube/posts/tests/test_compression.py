@@ -0,0 +1,107 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.views import serve_static
+from ..models import Post, User
+
+STATIC_ROOT = tempfile.mkdtemp()
+STORAGE = "core.staticfiles.CompressedManifestStaticFilesStorage"
+
+
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username="author")
+        Post.objects.bulk_create(
+            Post(author=author, text=f"Тестовый пост {number}")
+            for number in range(10)
+        )
+
+    def test_html_is_compressed(self):
+        """Страница сжимается, если клиент принимает gzip"""
+        response = Client().get(
+            reverse("posts:index"), HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", response["Vary"])
+        html = gzip.decompress(response.content).decode()
+        self.assertIn("Тестовый пост 9", html)
+
+    def test_without_accept_encoding(self):
+        """Без Accept-Encoding ответ не сжимается"""
+        response = Client().get(reverse("posts:index"))
+        self.assertFalse(response.has_header("Content-Encoding"))
+        response = Client().get(
+            reverse("posts:index"), HTTP_ACCEPT_ENCODING="gzip;q=0"
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_small_response_is_not_compressed(self):
+        """Ответы короче порога отдаются без сжатия"""
+        response = Client().get(
+            reverse("posts:index"), HTTP_ACCEPT_ENCODING="gzip"
+        )
+        self.assertFalse(response.has_header("Content-Encoding"))
+
+
+@override_settings(STATIC_ROOT=STATIC_ROOT, STATICFILES_STORAGE=STORAGE)
+class StaticPipelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command("collectstatic", interactive=False, verbosity=0)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(STATIC_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def test_hashed_and_precompressed(self):
+        """collectstatic создаёт хешированные имена и сжатые копии"""
+        name = staticfiles_storage.stored_name("css/bootstrap.min.css")
+        self.assertNotEqual(name, "css/bootstrap.min.css")
+        self.assertTrue(
+            os.path.isfile(os.path.join(STATIC_ROOT, name + ".gz"))
+        )
+        image = staticfiles_storage.stored_name("img/logo.png")
+        self.assertFalse(
+            os.path.isfile(os.path.join(STATIC_ROOT, image + ".gz"))
+        )
+
+    def test_serve_precompressed_with_far_future_cache(self):
+        """Хешированный файл отдаётся сжатым и кешируется на год"""
+        name = staticfiles_storage.stored_name("css/bootstrap.min.css")
+        request = RequestFactory().get(
+            "/static/" + name, HTTP_ACCEPT_ENCODING="gzip, deflate"
+        )
+        response = serve_static(request, name)
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        self.assertEqual(response["Content-Type"], "text/css")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        body = gzip.decompress(b"".join(response.streaming_content))
+        with open(os.path.join(STATIC_ROOT, name), "rb") as original:
+            self.assertEqual(body, original.read())
+
+    def test_serve_unhashed_name(self):
+        """Файл без хеша в имени кешируется ненадолго"""
+        request = RequestFactory().get("/static/css/bootstrap.min.css")
+        response = serve_static(request, "css/bootstrap.min.css")
+        self.assertFalse(response.has_header("Content-Encoding"))
+        self.assertIn("max-age=60", response["Cache-Control"])
+
+    def test_page_weight_command(self):
+        """Команда сравнивает объём страницы до и после сжатия"""
+        out = StringIO()
+        call_command("page_weight", stdout=out)
+        self.assertIn("css/bootstrap.min.css", out.getvalue())
+        self.assertIn("Итого", out.getvalue())
@@ -1,12 +1,19 @@
 import shutil
+import struct
 import tempfile
+import zlib
 
 from http import HTTPStatus
+from io import BytesIO
+from unittest import mock
+
+from PIL import Image, PngImagePlugin
 
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from core.uploads import SizeLimitedUploadHandler
 from ..models import Post, Group, User, Comment
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -162,3 +169,116 @@ class PostFormTests(TestCase):
             response, f"/auth/login/?next=/posts/{self.post.id}/comment/"
         )
         self.assertEqual(self.post.comments.count(), comment_count)
+
+
+def make_jpeg(size=(20, 20)):
+    image = Image.new("RGB", size, "red")
+    exif = Image.Exif()
+    exif[0x010F] = "Тестовая камера"
+    buffer = BytesIO()
+    image.save(buffer, "JPEG", exif=exif)
+    return SimpleUploadedFile(
+        name="photo.jpg", content=buffer.getvalue(), content_type="image/jpeg"
+    )
+
+
+def png_chunk(kind, data):
+    crc = zlib.crc32(kind + data)
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", crc)
+
+
+def make_png_header(width, height):
+    """PNG с заголовком нужного размера и пустыми данными."""
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    content = (
+        b"\x89PNG\r\n\x1a\n"
+        + png_chunk(b"IHDR", header)
+        + png_chunk(b"IDAT", b"")
+        + png_chunk(b"IEND", b"")
+    )
+    return SimpleUploadedFile(
+        name="bomb.png", content=content, content_type="image/png"
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ImageUploadLimitsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="uploader")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def create_post(self, image):
+        return self.authorized_client.post(
+            reverse("posts:post_create"),
+            data={"text": "Пост с картинкой", "image": image},
+        )
+
+    @override_settings(MAX_UPLOAD_SIZE=100)
+    def test_oversized_file_rejected(self):
+        """Файл больше MAX_UPLOAD_SIZE отклоняется"""
+        response = self.create_post(make_jpeg())
+        self.assertFormError(
+            response, "form", "image", "Файл больше 100\xa0байт."
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(MAX_UPLOAD_SIZE=100, MAX_UPLOAD_FORM_SIZE=100)
+    def test_oversized_request_rejected_before_reading(self):
+        """Запрос длиннее лимита отклоняется до чтения тела"""
+        with mock.patch.object(
+            SizeLimitedUploadHandler, "receive_data_chunk"
+        ) as receive:
+            response = self.create_post(make_jpeg())
+        self.assertEqual(response.status_code, HTTPStatus.BAD_REQUEST)
+        receive.assert_not_called()
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_resolution_checked_before_decoding(self):
+        """Разрешение проверяется по заголовку, без декодирования"""
+        with mock.patch.object(PngImagePlugin.PngImageFile, "load") as load:
+            response = self.create_post(make_png_header(20, 20))
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Слишком большое разрешение картинки: 20×20.",
+        )
+        load.assert_not_called()
+
+    def test_decompression_bomb_rejected(self):
+        """Картинка-бомба отклоняется по заголовку"""
+        response = self.create_post(make_png_header(100000, 100000))
+        self.assertFormError(
+            response, "form", "image", "Слишком большое разрешение картинки."
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_huge_resolution_rejected(self):
+        """Картинка со слишком большим разрешением отклоняется"""
+        response = self.create_post(make_jpeg())
+        self.assertFormError(
+            response,
+            "form",
+            "image",
+            "Слишком большое разрешение картинки: 20×20.",
+        )
+
+    @override_settings(POST_IMAGE_MAX_SIDE=10)
+    def test_image_reencoded_without_exif(self):
+        """Картинка перекодируется без EXIF и уменьшается"""
+        self.create_post(make_jpeg())
+        with Image.open(Post.objects.get().image.path) as image:
+            self.assertEqual(image.size, (10, 10))
+            self.assertEqual(len(image.getexif()), 0)
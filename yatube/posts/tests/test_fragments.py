@@ -0,0 +1,60 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import metrics
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        cls.post = Post.objects.create(
+            author=cls.user, text="Тестовый пост", group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def get_profile(self):
+        return self.guest_client.get(
+            reverse("posts:profile", args=[self.user.username])
+        )
+
+    def test_card_is_served_from_cache(self):
+        """Повторная отрисовка карточки берётся из кеша"""
+        self.get_profile()
+        hits = metrics.snapshot().get("post_card_cache_hits", 0)
+        self.get_profile()
+        self.assertEqual(metrics.snapshot()["post_card_cache_hits"], hits + 1)
+
+    def test_post_edit_invalidates_card(self):
+        """Изменение поста сразу видно в карточке"""
+        self.get_profile()
+        self.post.text = "Новый текст"
+        self.post.save()
+        self.assertContains(self.get_profile(), "Новый текст")
+
+    def test_group_change_invalidates_card(self):
+        """Изменение группы обновляет ссылки в карточках"""
+        self.get_profile()
+        self.group.slug = "new-slug"
+        self.group.save()
+        self.assertContains(self.get_profile(), "/group/new-slug/")
+        self.group.slug = "test-slug"
+        self.group.save()
+
+    def test_metrics_exposed(self):
+        """Счётчики кеша карточек доступны на /metrics/"""
+        self.get_profile()
+        response = self.guest_client.get("/metrics/", REMOTE_ADDR="127.0.0.1")
+        self.assertContains(response, "post_card_cache_misses")
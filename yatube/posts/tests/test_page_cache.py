@@ -0,0 +1,100 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core import db_routers
+from core.cache import (bump_generation, cache_page_by_generation,
+                        get_generation, page_cache_key)
+
+
+@override_settings(SINGLE_FLIGHT_WAIT=0.1)
+class SingleFlightTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.renders = 0
+
+        @cache_page_by_generation("test", key_prefix="test_page")
+        def view(request):
+            self.renders += 1
+            return HttpResponse(f"render {self.renders}")
+
+        self.view = view
+
+    def tearDown(self):
+        db_routers.reset()
+
+    def request(self, **params):
+        request = RequestFactory().get("/page/", params)
+        request.user = AnonymousUser()
+        return request
+
+    def get(self, **params):
+        return self.view(self.request(**params)).content.decode()
+
+    def hold_lock(self):
+        """Имитирует другой запрос, который сейчас строит страницу"""
+        key = page_cache_key(
+            self.request(), "test_page", get_generation("test")
+        )
+        cache.set(f"lock:{key}", True)
+
+    def test_page_is_rendered_once(self):
+        """Страница строится один раз на поколение"""
+        self.assertEqual(self.get(), "render 1")
+        self.assertEqual(self.get(), "render 1")
+        bump_generation("test")
+        self.assertEqual(self.get(), "render 2")
+
+    def test_stale_page_while_locked(self):
+        """Пока страницу строит другой запрос, отдаётся прошлая версия"""
+        self.get()
+        bump_generation("test")
+        self.hold_lock()
+        self.assertEqual(self.get(), "render 1")
+        self.assertEqual(self.renders, 1)
+
+    def test_writer_does_not_get_stale_page(self):
+        """Только что писавший пользователь не получает прошлую версию"""
+        self.get()
+        bump_generation("test")
+        self.hold_lock()
+        db_routers.pin_to_primary()
+        self.assertEqual(self.get(), "render 2")
+
+    def test_renders_after_wait_without_stale(self):
+        """Без прошлой версии запрос ждёт и строит страницу сам"""
+        self.hold_lock()
+        self.assertEqual(self.get(), "render 1")
+
+    def test_unused_query_params_share_page(self):
+        """Параметры, которые view не читает, не создают новых страниц"""
+        self.assertEqual(self.get(), "render 1")
+        self.assertEqual(self.get(x="random"), "render 1")
+        self.assertEqual(self.get(page="2"), "render 2")
+        self.assertEqual(self.get(page="2", utm="mail"), "render 2")
+
+    def test_pages_expire(self):
+        """Страницы хранятся в кеше ограниченное время"""
+        with mock.patch.object(cache, "set", wraps=cache.set) as cache_set:
+            self.get()
+        timeouts = [call[0][2] for call in cache_set.call_args_list]
+        self.assertEqual(len(timeouts), 2)
+        self.assertNotIn(None, timeouts)
+
+    def test_expired_lock_of_another_request_is_kept(self):
+        """Долгое построение не снимает блокировку другого запроса"""
+        key = page_cache_key(
+            self.request(), "test_page", get_generation("test")
+        )
+
+        @cache_page_by_generation("test", key_prefix="test_page")
+        def slow_view(request):
+            # Блокировка истекла, и её взял другой запрос
+            cache.set(f"lock:{key}", "other")
+            return HttpResponse("slow")
+
+        slow_view(self.request())
+        self.assertEqual(cache.get(f"lock:{key}"), "other")
@@ -0,0 +1,176 @@
+import base64
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..paginator import CursorPaginator
+
+User = get_user_model()
+
+TAMPERED_KEYS = (
+    [None, None],
+    [1.5, 1],
+    [[1], 1],
+    ["2020-01-01T00:00:00+00:00", 10 ** 30],
+    ["2020-01-01T00:00:00+00:00", True],
+    [{"a": 1}, 1],
+    5,
+)
+
+
+def tampered_cursors():
+    for key in TAMPERED_KEYS:
+        payload = json.dumps({"k": key, "d": "next", "n": 2})
+        yield base64.urlsafe_b64encode(payload.encode()).decode()
+    infinite = b'{"k":["x",1],"d":"next","n":1e999}'
+    yield base64.urlsafe_b64encode(infinite).decode()
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Тестовый пост {i}") for i in range(25)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_walks_all_posts(self):
+        """Курсоры вперёд обходят ленту без пропусков и повторов"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        page = paginator.get_page(1)
+        seen = [post.pk for post in page]
+        while page.has_next():
+            page = paginator.get_page(cursor=page.next_cursor)
+            seen.extend(post.pk for post in page)
+        expected = list(Post.objects.order_by(
+            "-pub_date", "-id"
+        ).values_list("pk", flat=True))
+        self.assertEqual(seen, expected)
+        self.assertEqual(page.number, 3)
+        self.assertEqual(len(page), 5)
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор назад возвращает ту же страницу, что и номер"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        second = paginator.get_page(cursor=paginator.get_page(1).next_cursor)
+        first = paginator.get_page(cursor=second.previous_cursor)
+        self.assertEqual(first.number, 1)
+        self.assertFalse(first.has_previous())
+        self.assertEqual(list(first), list(paginator.get_page(1)))
+
+    def test_invalid_cursor_falls_back_to_first_page(self):
+        """Испорченный курсор не ломает страницу"""
+        response = self.client.get(reverse("posts:index") + "?cursor=broken")
+        self.assertEqual(response.context["page_obj"].number, 1)
+        self.assertEqual(len(response.context["page_obj"]), 10)
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        """Курсор с подменёнными значениями не приводит к ошибке"""
+        for cursor in tampered_cursors():
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse("posts:index"), {"cursor": cursor}
+                )
+                self.assertEqual(response.context["page_obj"].number, 1)
+
+    def test_elided_page_range(self):
+        """Навигация показывает края и окрестность текущей страницы"""
+        paginator = CursorPaginator(Post.objects.all(), 1)
+        cases = {
+            1: [1, 2, 3, "…", 25],
+            5: [1, 2, 3, 4, 5, 6, 7, "…", 25],
+            13: [1, "…", 11, 12, 13, 14, 15, "…", 25],
+            25: [1, "…", 23, 24, 25],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                page = paginator.get_page(number)
+                self.assertEqual(page.elided_page_range, expected)
+        short = CursorPaginator(Post.objects.all(), 5)
+        self.assertEqual(short.get_page(3).elided_page_range, [1, 2, 3, 4, 5])
+
+    def test_paginator_template_is_windowed(self):
+        """Число ссылок на страницы не растёт вместе с числом страниц"""
+        page = CursorPaginator(Post.objects.all(), 1).get_page(13)
+        html = render_to_string(
+            "posts/includes/paginator.html", {"page_obj": page}
+        )
+        self.assertEqual(html.count('class="page-item"'), 10)
+        self.assertEqual(html.count("page-item disabled"), 2)
+        self.assertNotIn("page=20\"", html)
+
+    def test_approximate_count_is_cached(self):
+        """В приближённом режиме COUNT(*) выполняется один раз"""
+        CursorPaginator(Post.objects.all(), 10, approximate_count=True).count
+        with self.assertNumQueries(0):
+            count = CursorPaginator(
+                Post.objects.all(), 10, approximate_count=True
+            ).count
+        self.assertEqual(count, 25)
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+        cls.post = Post.objects.create(author=cls.user, text="Пост")
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f"Комментарий {i}")
+            for i in range(25)
+        )
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста только первые комментарии и ссылка на остальные"""
+        response = self.client.get(
+            reverse("posts:post_detail", args=[self.post.id])
+        )
+        comments = response.context["comments"]
+        self.assertEqual(len(comments), 20)
+        self.assertEqual(comments[0].text, "Комментарий 24")
+        self.assertContains(response, comments.next_cursor)
+
+    def test_comments_fragment(self):
+        """Следующие комментарии отдаются фрагментом по курсору"""
+        url = reverse("posts:post_comments", args=[self.post.id])
+        first = self.client.get(url).context["comments"]
+        response = self.client.get(url, {"cursor": first.next_cursor})
+        comments = response.context["comments"]
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [f"Комментарий {i}" for i in range(4, -1, -1)],
+        )
+        self.assertNotContains(response, "Показать ещё")
+        self.assertTemplateNotUsed(response, "base.html")
+
+    def test_tampered_cursor_shows_first_comments(self):
+        """Подменённый курсор комментариев отдаёт первую порцию"""
+        requests = (
+            (reverse("posts:post_comments", args=[self.post.id]), "cursor"),
+            (reverse("posts:post_detail", args=[self.post.id]), "comments"),
+        )
+        for url, param in requests:
+            for cursor in tampered_cursors():
+                with self.subTest(url=url, cursor=cursor):
+                    response = self.client.get(url, {param: cursor})
+                    comments = response.context["comments"]
+                    self.assertEqual(comments[0].text, "Комментарий 24")
+
+    def test_comments_json(self):
+        """Комментарии отдаются в JSON со ссылкой на следующую порцию"""
+        url = reverse("posts:post_comments", args=[self.post.id])
+        data = self.client.get(url, {"format": "json"}).json()
+        self.assertEqual(len(data["comments"]), 20)
+        self.assertEqual(data["comments"][0]["author"], "egor")
+        data = self.client.get(data["next"]).json()
+        self.assertEqual(len(data["comments"]), 5)
+        self.assertIsNone(data["next"])
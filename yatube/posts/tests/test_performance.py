@@ -0,0 +1,92 @@
+import re
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+
+from core import metrics
+from ..models import Post, User
+
+
+def histogram_count(name, view):
+    match = re.search(
+        rf'^{name}_count{{view="{view}"}} (\d+)$',
+        metrics.render_prometheus(), re.MULTILINE,
+    )
+    return int(match.group(1)) if match else 0
+
+
+class PerformanceMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(username="author")
+        Post.objects.create(author=author, text="Тестовый пост")
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_server_timing(self):
+        """Замеренный запрос отдаёт время SQL, шаблонов и кеша"""
+        response = self.client.get("/")
+        parts = response["Server-Timing"].split(", ")
+        timing = dict(part.split(";", 1) for part in parts)
+        self.assertEqual(set(timing), {"app", "db", "tpl", "cache"})
+        self.assertRegex(timing["db"], r'dur=[\d.]+;desc="[1-9]\d* SQL"')
+        self.assertRegex(timing["cache"], r'desc="\d+ hit [1-9]\d* miss"')
+        self.assertNotEqual(timing["tpl"], "dur=0.0")
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_histograms_by_view(self):
+        """Замеры копятся в гистограммах с меткой view"""
+        before = histogram_count("http_request_queries", "posts:index")
+        self.client.get("/")
+        self.assertEqual(
+            histogram_count("http_request_queries", "posts:index"),
+            before + 1,
+        )
+        self.assertIn(
+            "http_request_duration_seconds_bucket"
+            '{le="+Inf",view="posts:index"}',
+            metrics.render_prometheus(),
+        )
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_request(self):
+        """Незамеренный запрос пишет только время ответа"""
+        queries = histogram_count("http_request_queries", "posts:index")
+        durations = histogram_count(
+            "http_request_duration_seconds", "posts:index"
+        )
+        response = self.client.get("/")
+        self.assertFalse(response.has_header("Server-Timing"))
+        self.assertEqual(
+            histogram_count("http_request_queries", "posts:index"), queries
+        )
+        self.assertEqual(
+            histogram_count("http_request_duration_seconds", "posts:index"),
+            durations + 1,
+        )
+
+
+class MetricsTests(TestCase):
+    def test_nested_timing_counted_once(self):
+        """Вложенные замеры одного имени не суммируются"""
+        with metrics.collect() as stats:
+            with metrics.timed("template"):
+                with metrics.timed("template"):
+                    pass
+                outer = stats.timings["template"]
+        self.assertEqual(outer, 0)
+        self.assertGreater(stats.timings["template"], 0)
+
+    def test_histogram_buckets_cumulative(self):
+        """Корзины гистограммы накопительные"""
+        metrics.describe("test_latency", "Тест", buckets=(1, 2))
+        for value in (0.5, 1.5, 3):
+            metrics.observe("test_latency", value, view="test")
+        text = metrics.render_prometheus()
+        self.assertIn('test_latency_bucket{le="1",view="test"} 1', text)
+        self.assertIn('test_latency_bucket{le="2",view="test"} 2', text)
+        self.assertIn('test_latency_bucket{le="+Inf",view="test"} 3', text)
+        self.assertIn('test_latency_sum{view="test"} 5.0', text)
@@ -0,0 +1,76 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from core.query_budget import QueryBudgetMixin, budget_of
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(QUERY_BUDGET_STRICT=True, MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class FeedQueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username="author")
+        cls.reader = User.objects.create_user(username="reader")
+        cls.group = Group.objects.create(
+            title="Тестовая группа", slug="test-slug", description="Описание"
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        for i in range(15):
+            # У большинства постов есть картинка: карточкам нужны миниатюры
+            image = ""
+            if i % 4:
+                image = SimpleUploadedFile(
+                    f"small{i}.gif", SMALL_GIF, "image/gif"
+                )
+            cls.post = Post.objects.create(
+                author=cls.author, text=f"Пост {i}", group=cls.group,
+                image=image,
+            )
+            Comment.objects.create(
+                post=cls.post, author=cls.reader, text="Комментарий"
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def test_feed_views_fit_query_budget(self):
+        """Число запросов ленты не зависит от числа постов на странице"""
+        urls = (
+            reverse("posts:index"),
+            reverse("posts:group_posts", args=[self.group.slug]),
+            reverse("posts:profile", args=[self.author.username]),
+            reverse("posts:post_detail", args=[self.post.id]),
+            reverse("posts:follow_index"),
+        )
+        for url in urls:
+            budget = budget_of(resolve(url).func)
+            with self.subTest(url=url):
+                with self.assertMaxQueries(budget):
+                    self.authorized_client.get(url)
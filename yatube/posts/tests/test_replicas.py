@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import (Client, RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import db_routers
+from core.db_routers import ReplicaRouter
+from core.middleware import ReplicaPinningMiddleware
+from ..models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        db_routers.reset()
+        self.router = ReplicaRouter()
+
+    def tearDown(self):
+        db_routers.reset()
+
+    def test_feed_reads_go_to_replica(self):
+        """Чтение постов идёт с реплики, остальных моделей — с основной"""
+        self.assertEqual(self.router.db_for_read(Post), "replica1")
+        self.assertEqual(self.router.db_for_read(User), "default")
+        self.assertEqual(self.router.db_for_write(User), "default")
+
+    def test_write_pins_reads_to_primary(self):
+        """После записи чтение идёт с основной базы"""
+        self.assertEqual(self.router.db_for_write(Post), "default")
+        self.assertEqual(self.router.db_for_read(Post), "default")
+
+    def test_replica_is_not_migrated(self):
+        """Миграции не применяются к репликам"""
+        self.assertFalse(self.router.allow_migrate("replica1", "posts"))
+        self.assertTrue(self.router.allow_migrate("default", "posts"))
+
+    def test_replica_pages_expire(self):
+        """Прочитанное с реплики кешируется не дольше её отставания"""
+        with self.settings(REPLICA_PIN_SECONDS=5):
+            self.assertEqual(db_routers.replica_cache_timeout(None), 5)
+            self.assertEqual(
+                db_routers.replica_cache_timeout(60, "default"), 60
+            )
+
+
+class ReplicaRouterTransactionTests(TestCase):
+    @override_settings(DATABASE_REPLICAS=["replica1"])
+    def test_reads_inside_transaction_use_primary(self):
+        """Внутри транзакции чтение идёт с основной базы"""
+        with transaction.atomic():
+            self.assertEqual(ReplicaRouter().db_for_read(Post), "default")
+
+
+@override_settings(REPLICA_PIN_SECONDS=5)
+class ReplicaPinningMiddlewareTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="author")
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_write_sets_pin_cookie(self):
+        """Подписка закрепляет чтение за основной базой"""
+        response = self.authorized_client.get(
+            reverse("posts:profile_follow", args=[self.author.username])
+        )
+        cookie = response.cookies[db_routers.PIN_COOKIE]
+        self.assertEqual(cookie["max-age"], 5)
+
+    def test_read_does_not_set_pin_cookie(self):
+        """Чтение ленты не ставит cookie"""
+        response = self.authorized_client.get(reverse("posts:index"))
+        self.assertNotIn(db_routers.PIN_COOKIE, response.cookies)
+
+    def test_pin_cookie_pins_request(self):
+        """Запрос с cookie читает с основной базы"""
+        pinned = []
+
+        def view(request):
+            pinned.append(db_routers.is_pinned())
+            return HttpResponse()
+
+        middleware = ReplicaPinningMiddleware(view)
+        request = RequestFactory().get("/")
+        request.COOKIES[db_routers.PIN_COOKIE] = "1"
+        middleware(request)
+        middleware(RequestFactory().get("/"))
+        self.assertEqual(pinned, [True, False])
+        self.assertFalse(db_routers.is_pinned())
@@ -0,0 +1,108 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import search
+from ..models import Post, SearchTerm
+
+User = get_user_model()
+
+
+class TokenizeTests(TestCase):
+    def test_stem_reduces_word_forms(self):
+        """Разные формы слова приводятся к одной основе"""
+        self.assertEqual(search.stem("котами"), search.stem("кот"))
+        self.assertEqual(search.stem("красивая"), search.stem("красивый"))
+
+    def test_tokenize_drops_stop_words(self):
+        """Стоп-слова и регистр не попадают в индекс"""
+        self.assertEqual(
+            search.tokenize("Кот и ЁЖ"), [search.stem("кот"), "еж"]
+        )
+
+
+@override_settings(SEARCH_BACKEND="fts5")
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="auth")
+        cls.cats = Post.objects.create(
+            author=cls.user, text="Коробки, коробки и коробка"
+        )
+        cls.cat = Post.objects.create(author=cls.user, text="Кошка и коробка")
+        cls.dog = Post.objects.create(
+            author=cls.user, text="Собака грызёт кость"
+        )
+
+    def setUp(self):
+        self.client = Client()
+
+    def find(self, query):
+        return list(search.search(query).order_by(*search.SEARCH_ORDERING))
+
+    def test_matches_all_word_forms(self):
+        """Поиск находит посты с другими формами слов запроса"""
+        self.assertCountEqual(self.find("коробками"), [self.cats, self.cat])
+        self.assertEqual(self.find("собаки кость"), [self.dog])
+        self.assertEqual(self.find("собаки коробка"), [])
+
+    def test_ranking(self):
+        """Пост с большим числом вхождений выше в выдаче"""
+        self.assertEqual(self.find("коробка"), [self.cats, self.cat])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при изменении и удалении поста"""
+        post = Post.objects.create(author=self.user, text="Кот грызёт кость")
+        post.text = "Кот спит"
+        post.save()
+        self.assertEqual(self.find("кот кость"), [])
+        self.assertEqual(self.find("кот спит"), [post])
+        post.delete()
+        self.assertEqual(self.find("кот спит"), [])
+
+    def test_search_page(self):
+        """Страница поиска листается курсором и сохраняет запрос"""
+        for i in range(12):
+            Post.objects.create(author=self.user, text=f"Коробка номер {i}")
+        url = reverse("posts:post_search")
+        response = self.client.get(url, {"q": "коробки"})
+        page = response.context["page_obj"]
+        self.assertEqual(page[0], self.cats)
+        query = "%D0%BA%D0%BE%D1%80%D0%BE%D0%B1%D0%BA%D0%B8"
+        self.assertContains(
+            response, f"?q={query}&amp;cursor={page.next_cursor}"
+        )
+        response = self.client.get(
+            url, {"q": "коробки", "cursor": page.next_cursor}
+        )
+        page = response.context["page_obj"]
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 4)
+        self.assertNotIn(self.dog, page)
+
+    def test_empty_query(self):
+        """Пустой запрос ничего не находит"""
+        response = self.client.get(reverse("posts:post_search"), {"q": " и "})
+        self.assertEqual(len(response.context["page_obj"]), 0)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт по индексу"""
+        admin = User.objects.create_superuser(
+            "admin", "admin@example.com", "pass"
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse("admin:posts_post_changelist"), {"q": "собаки"}
+        )
+        self.assertEqual(list(response.context["cl"].result_list), [self.dog])
+
+
+@override_settings(SEARCH_BACKEND="inverted")
+class InvertedIndexSearchTests(SearchTests):
+    def test_terms_are_stored(self):
+        """Без FTS5 основы слов хранятся в таблице"""
+        terms = SearchTerm.objects.filter(post=self.cats)
+        self.assertEqual(
+            terms.get(term=search.stem("коробки")).weight, 3
+        )
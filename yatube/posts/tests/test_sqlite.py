@@ -0,0 +1,28 @@
+import io
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied(self):
+        """Новое соединение получает PRAGMA из SQLITE_PRAGMAS"""
+        self.assertEqual(self.pragma("synchronous"), 1)
+        self.assertEqual(self.pragma("cache_size"), -64 * 1024)
+        self.assertEqual(self.pragma("busy_timeout"), 5000)
+
+    def test_benchmark_command(self):
+        """Замер сравнивает настройки по умолчанию и SQLITE_PRAGMAS"""
+        output = io.StringIO()
+        call_command(
+            "sqlite_benchmark", readers=2, writers=1, seconds=0.2, posts=100,
+            stdout=output,
+        )
+        self.assertIn("SQLITE_PRAGMAS", output.getvalue())
+        self.assertIn("ошибок: 0", output.getvalue())
@@ -0,0 +1,43 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+
+from core.template_backends import profile_renders, warm_up
+from ..management.commands.profile_templates import templates_setting
+
+
+class TemplateLoaderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            "seed_load", posts=30, seed=1, stdout=StringIO(), stderr=StringIO()
+        )
+
+    def test_warm_up_with_cached_loader(self):
+        """Прогрев компилирует шаблоны только при cached.Loader"""
+        with override_settings(TEMPLATES=templates_setting(True)):
+            self.assertGreater(warm_up(), 0)
+        with override_settings(TEMPLATES=templates_setting(False)):
+            self.assertEqual(warm_up(), 0)
+
+    def test_profile_renders(self):
+        """Своё время шаблона не включает вложенные шаблоны"""
+        with profile_renders() as stats:
+            render_to_string("core/404.html", {"path": "/missing/"})
+        self.assertEqual(stats["core/404.html"].renders, 1)
+        self.assertEqual(stats["base.html"].renders, 1)
+        for entry in stats.values():
+            self.assertLessEqual(entry.own, entry.total)
+        self.assertLess(stats["base.html"].own, stats["base.html"].total)
+
+    def test_profile_templates_command(self):
+        """Команда выводит время шаблонов страниц"""
+        out = StringIO()
+        call_command(
+            "profile_templates", "index", "--repeat", "2",
+            "--loader", "cached", stdout=out,
+        )
+        self.assertIn("cached.Loader", out.getvalue())
+        self.assertIn("base.html", out.getvalue())
@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import resolve, reverse
+
+from core.query_budget import QueryBudgetMixin, budget_of
+from .. import images, thumbnails
+from ..models import Post
+
+User = get_user_model()
+GET_IMAGE = "sorl.thumbnail.default.engine.get_image"
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailPregenerationTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username="egor")
+        cls.post = Post.objects.create(
+            author=cls.user,
+            text="Пост с картинкой",
+            image=SimpleUploadedFile("small.gif", SMALL_GIF, "image/gif"),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(thumbnails, "_requested", set())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_profile(self):
+        return self.client.get(
+            reverse("posts:profile", args=[self.user.username])
+        )
+
+    def test_render_never_decodes_image(self):
+        """Отрисовка ленты не декодирует картинку, а отдаёт оригинал"""
+        with mock.patch(GET_IMAGE) as get_image:
+            response = self.get_profile()
+        get_image.assert_not_called()
+        self.assertContains(response, self.post.image.url)
+
+    def test_generated_thumbnail_is_rendered(self):
+        """После генерации лента показывает миниатюру"""
+        with mock.patch("posts.thumbnails.connections.close_all"):
+            thumbnails.generate(self.post.image.name)
+        with mock.patch(GET_IMAGE) as get_image:
+            response = self.get_profile()
+        get_image.assert_not_called()
+        self.assertContains(response, "/media/cache/")
+        self.assertNotContains(response, f'src="{self.post.image.url}"')
+
+    def test_webp_variants_in_srcset(self):
+        """Карточка предлагает WebP-варианты разной ширины"""
+        with mock.patch("posts.thumbnails.connections.close_all"):
+            thumbnails.generate(self.post.image.name)
+        response = self.get_profile()
+        for width in settings.POST_IMAGE_WIDTHS:
+            with self.subTest(width=width):
+                self.assertContains(response, f".w{width}.webp {width}w")
+        self.assertContains(response, 'type="image/webp"')
+
+    def test_feed_loads_thumbnails_in_one_query(self):
+        """Миниатюры карточек ленты берутся одним запросом, а не по одному"""
+        Post.objects.bulk_create(
+            Post(
+                author=self.user, text=f"Пост {i}", image=self.post.image.name
+            )
+            for i in range(9)
+        )
+        url = reverse("posts:profile", args=[self.user.username])
+        with mock.patch("posts.thumbnails.schedule") as schedule:
+            with self.assertMaxQueries(budget_of(resolve(url).func)):
+                self.client.get(url)
+        schedule.assert_called_once_with(self.post.image.name)
+
+    def test_missing_thumbnail_is_scheduled_once(self):
+        """Отсутствующая миниатюра ставится в очередь один раз"""
+        with mock.patch("posts.thumbnails.schedule") as schedule:
+            for _ in range(3):
+                cache.clear()
+                self.get_profile()
+        schedule.assert_called_once_with(self.post.image.name)
+
+    def test_variant_names_keep_extension(self):
+        """Варианты a.jpg и a.png не перезаписывают друг друга"""
+        self.assertNotEqual(
+            images.variant_name("posts/a.jpg", 320, "webp"),
+            images.variant_name("posts/a.png", 320, "webp"),
+        )
+
+    def test_render_does_not_check_variant_files(self):
+        """Карточка берёт готовые форматы из поста, а не из хранилища"""
+        with mock.patch("posts.thumbnails.connections.close_all"):
+            thumbnails.generate(self.post.image.name)
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertIn("webp", post.image_variants.split(","))
+        with mock.patch(
+            "django.core.files.storage.FileSystemStorage.exists"
+        ) as exists:
+            response = self.get_profile()
+        exists.assert_not_called()
+        self.assertContains(response, 'type="image/webp"')
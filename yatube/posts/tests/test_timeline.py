@@ -0,0 +1,112 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username="reader")
+        cls.author = User.objects.create_user(username="author")
+        cls.stranger = User.objects.create_user(username="stranger")
+        cls.old_post = Post.objects.create(
+            author=cls.author, text="Старый пост"
+        )
+
+    def setUp(self):
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        return list(response.context["page_obj"])
+
+    def test_follow_backfills_timeline(self):
+        """Подписка переносит посты автора в ленту"""
+        self.authorized_client.get(
+            reverse("posts:profile_follow", args=[self.author.username])
+        )
+        self.assertEqual(self.feed(), [self.old_post])
+
+    def test_new_post_is_fanned_out(self):
+        """Новый пост автора попадает в ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text="Новый пост")
+        Post.objects.create(author=self.stranger, text="Чужой пост")
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_unfollow_clears_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.authorized_client.get(
+            reverse("posts:profile_unfollow", args=[self.author.username])
+        )
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.reader).exists()
+        )
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_popular_author_is_read_on_demand(self):
+        """Посты популярных авторов подмешиваются при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        new_post = Post.objects.create(author=self.author, text="Новый пост")
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_stays_pulled_after_unfollows(self):
+        """Посты, написанные без раздачи, не пропадают после отписок"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        new_post = Post.objects.create(author=self.author, text="Новый пост")
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=new_post).exists()
+        )
+        Follow.objects.filter(user=self.stranger).delete()
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+        later_post = Post.objects.create(author=self.author, text="Ещё пост")
+        self.assertEqual(self.feed(), [later_post, new_post, self.old_post])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_rebuild_fans_out_again(self):
+        """Полная пересборка снова раздаёт посты автора с малым числом
+        подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.stranger, author=self.author)
+        new_post = Post.objects.create(author=self.author, text="Новый пост")
+        Follow.objects.filter(user=self.stranger).delete()
+        timeline.rebuild()
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=self.reader, post=new_post
+        ).exists())
+        self.assertEqual(self.feed(), [new_post, self.old_post])
+
+    def test_timeline_cursor_pagination(self):
+        """Лента подписок листается курсором"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(12):
+            Post.objects.create(author=self.author, text=f"Пост {i}")
+        response = self.authorized_client.get(reverse("posts:follow_index"))
+        cursor = response.context["page_obj"].next_cursor
+        response = self.authorized_client.get(
+            reverse("posts:follow_index") + f"?cursor={cursor}"
+        )
+        page = response.context["page_obj"]
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page), 3)
+        self.assertEqual(page[-1], self.old_post)
+
+    def test_repeated_follow_is_ignored(self):
+        """Повторная подписка не создаёт дубликат"""
+        url = reverse("posts:profile_follow", args=[self.author.username])
+        self.authorized_client.get(url)
+        self.authorized_client.get(url)
+        follows = Follow.objects.filter(user=self.reader, author=self.author)
+        self.assertEqual(follows.count(), 1)
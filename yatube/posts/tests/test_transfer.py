@@ -0,0 +1,117 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from .. import search
+from ..models import Comment, Follow, Group, Post, TimelineEntry, UserStats
+
+User = get_user_model()
+
+
+class TransferCommandsTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        author = User.objects.create_user(username="author")
+        reader = User.objects.create_user(username="reader")
+        group = Group.objects.create(
+            title="Группа", slug="group", description=""
+        )
+        self.post = Post.objects.create(
+            author=author, group=group, text="Пост"
+        )
+        self.comment = Comment.objects.create(
+            post=self.post, author=reader, text="Комментарий"
+        )
+        Follow.objects.create(user=reader, author=author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def call(self, *args, **options):
+        call_command(
+            *args, stdout=io.StringIO(), stderr=io.StringIO(), **options
+        )
+
+    def clear(self):
+        User.objects.all().delete()
+        Group.objects.all().delete()
+
+    def assert_restored(self):
+        post = Post.objects.get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, self.post.pub_date)
+        self.assertEqual(
+            Comment.objects.get(pk=self.comment.pk).created,
+            self.comment.created,
+        )
+        self.assertEqual(post.group.slug, "group")
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(Follow.objects.filter(
+            user__username="reader", author__username="author"
+        ).exists())
+        stats = UserStats.objects.get(user__username="author")
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+
+    def test_jsonl_round_trip(self):
+        """Выгрузка JSON Lines загружается обратно с датами и счётчиками"""
+        path = os.path.join(self.directory, "dump.jsonl")
+        self.call("export_posts", path, chunk_size=1)
+        self.clear()
+        self.call("import_posts", path, batch_size=1)
+        self.assert_restored()
+
+    def test_csv_round_trip(self):
+        """Выгрузка CSV загружается обратно"""
+        self.call("export_posts", self.directory, format="csv")
+        self.clear()
+        self.call("import_posts", self.directory)
+        self.assert_restored()
+
+    def test_import_updates_only_imported_posts(self):
+        """Импорт дополняет ленты и поиск, не пересобирая их целиком"""
+        path = os.path.join(self.directory, "dump.jsonl")
+        self.call("export_posts", path)
+        self.clear()
+        other = Post.objects.create(
+            author=User.objects.create_user(username="other"), text="Другой"
+        )
+        with mock.patch.object(
+            search, "index_post", wraps=search.index_post
+        ) as index_post:
+            self.call("import_posts", path)
+        self.assertEqual(
+            [call.args[0].pk for call in index_post.call_args_list],
+            [self.post.pk],
+        )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user__username="reader", post_id=self.post.pk
+        ).exists())
+        self.assertEqual(
+            list(search.search("пост").values_list("pk", flat=True)),
+            [self.post.pk],
+        )
+        self.assertEqual(
+            list(search.search("другой").values_list("pk", flat=True)),
+            [other.pk],
+        )
+
+    def test_checkpoint_skips_imported_rows(self):
+        """Импорт с контрольной точкой продолжается с места остановки"""
+        path = os.path.join(self.directory, "dump.jsonl")
+        checkpoint = os.path.join(self.directory, "checkpoint.json")
+        self.call("export_posts", path)
+        self.clear()
+        with open(checkpoint, "w") as stream:
+            json.dump({"dump.jsonl": 3}, stream)
+        self.call("import_posts", path, checkpoint=checkpoint)
+        self.assertFalse(Group.objects.exists())
+        self.assertFalse(Post.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+        with open(checkpoint) as stream:
+            self.assertEqual(json.load(stream), {"dump.jsonl": 4})
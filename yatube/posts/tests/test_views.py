@@ -239,20 +239,16 @@ class PostPagesTests(TestCase):
                 self.assertNotIn(expected, form_field)
 
     def test_cache(self):
-        response = self.authorized_client.get(
-            reverse("posts:index"))
+        """Главная страница кешируется, пока не изменятся посты"""
+        response = self.authorized_client.get(reverse("posts:index"))
         posts_old_content = response.content
-        post_last = Post.objects.last()
-        post_last.delete()
-        new_response = self.authorized_client.get(
-            reverse("posts:index"))
-        post_new_content = new_response.content
-        cache.clear()
-        new_response1 = self.authorized_client.get(
-            reverse("posts:index"))
-        post_new_content1 = new_response1.content
-        self.assertEqual(posts_old_content, post_new_content)
-        self.assertNotEqual(post_new_content, post_new_content1)
+        cached_response = self.authorized_client.get(reverse("posts:index"))
+        self.assertIsNone(cached_response.context)
+        self.assertEqual(posts_old_content, cached_response.content)
+        Post.objects.create(author=self.user, text="Свежий пост")
+        new_response = self.authorized_client.get(reverse("posts:index"))
+        self.assertNotEqual(posts_old_content, new_response.content)
+        self.assertContains(new_response, "Свежий пост")
 
     def test_404_template(self):
         response = self.authorized_client.get('http://127.0.0.1:8000/404')
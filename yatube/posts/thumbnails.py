@@ -0,0 +1,179 @@
+"""Заблаговременная генерация миниатюр картинок постов.
+
+Миниатюры всех размеров из ``POST_THUMBNAIL_GEOMETRIES`` строятся пулом
+потоков после сохранения поста. Бэкенд ``PregeneratedThumbnailBackend``
+никогда не декодирует картинку во время отрисовки: если миниатюры ещё
+нет, он один раз ставит её в очередь и отдаёт оригинал.
+
+Ленты загружают миниатюры всех карточек страницы из KV-хранилища sorl
+одним запросом (``prefetch``), а не по запросу на карточку.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core.cache import bump_generation
+from . import fragments, images
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+# Картинки, которые бэкенд уже ставил в очередь: отсутствующую или
+# битую миниатюру не перестраивают на каждой отрисовке
+_requested = set()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                thread_name_prefix='thumbnails',
+            )
+        return _executor
+
+
+def generate(name):
+    """Строит миниатюры и адаптивные варианты картинки в рабочем потоке."""
+    backend = ThumbnailBackend()
+    try:
+        for geometry in settings.POST_THUMBNAIL_GEOMETRIES:
+            backend.get_thumbnail(name, geometry, **THUMBNAIL_OPTIONS)
+        formats = images.generate_variants(name)
+        posts = Post.objects.filter(image=name)
+        posts.update(image_variants=','.join(formats))
+        # Карточки, отрисованные с оригиналом, перерисуются с миниатюрой
+        for pk in posts.values_list('pk', flat=True):
+            fragments.bump_version('post', pk)
+        bump_generation(fragments.FEED_GENERATION)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры для %s', name)
+    finally:
+        with _executor_lock:
+            _pending.discard(name)
+        connections.close_all()
+
+
+def schedule(name):
+    """Ставит картинку в очередь пула после фиксации транзакции."""
+    if not name:
+        return
+
+    def submit():
+        with _executor_lock:
+            if name in _pending:
+                return
+            _pending.add(name)
+        get_executor().submit(generate, name)
+    transaction.on_commit(submit)
+
+
+def schedule_once(name):
+    """Ставит картинку в очередь не больше одного раза за процесс."""
+    with _executor_lock:
+        if name in _requested:
+            return
+        _requested.add(name)
+    schedule(name)
+
+
+def _get_raw_many(keys):
+    """Значения KV-хранилища sorl по ключам: кеш и один запрос к базе."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(KVStoreModel.objects.filter(
+            key__in=missing
+        ).values_list('key', 'value'))
+        # Как cached_db: отсутствие тоже кешируется
+        loaded = {
+            key: found.get(key, cached_db_kvstore.EMPTY_VALUE)
+            for key in missing
+        }
+        kvstore.cache.set_many(loaded, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        values.update(loaded)
+    return {
+        key: None if value == cached_db_kvstore.EMPTY_VALUE else value
+        for key, value in values.items()
+    }
+
+
+def prefetch(files, geometry, **options):
+    """Загружает готовые миниатюры картинок страницы разом."""
+    backend = default.backend
+    if isinstance(backend, PregeneratedThumbnailBackend):
+        backend.prefetch(files, geometry, **{**THUMBNAIL_OPTIONS, **options})
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Отдаёт только готовые миниатюры, не декодируя картинки.
+
+    Найденные ``prefetch`` миниатюры запоминаются в файле картинки
+    (``post.image``), и ``get_thumbnail`` для него не обращается к
+    KV-хранилищу.
+    """
+
+    def prefetch(self, files, geometry_string, **options):
+        keys = {}
+        for file_ in files:
+            if not file_:
+                continue
+            _, name = self._thumbnail_name(file_, geometry_string, options)
+            key = add_prefix(ImageFile(name, default.storage).key)
+            keys[key] = (file_, name)
+        values = _get_raw_many(list(keys))
+        for key, (file_, name) in keys.items():
+            if not hasattr(file_, 'prefetched_thumbnails'):
+                file_.prefetched_thumbnails = {}
+            value = values.get(key)
+            file_.prefetched_thumbnails[name] = (
+                deserialize_image_file(value) if value else None
+            )
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        source, name = self._thumbnail_name(file_, geometry_string, options)
+        prefetched = getattr(file_, 'prefetched_thumbnails', {})
+        if name in prefetched:
+            cached = prefetched[name]
+        else:
+            cached = default.kvstore.get(ImageFile(name, default.storage))
+        if cached:
+            return cached
+        schedule_once(source.name)
+        return source
+
+    def _thumbnail_name(self, file_, geometry_string, options):
+        options = dict(options)
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return source, name
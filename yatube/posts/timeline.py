@@ -0,0 +1,161 @@
+"""Лента подписок с раздачей постов при записи (fan-out-on-write).
+
+Новый пост копируется в ``TimelineEntry`` каждого подписчика, поэтому
+чтение ленты — один проход по индексу ``(user, -pub_date, -post)``.
+Посты авторов, у которых подписчиков стало больше
+``TIMELINE_FANOUT_LIMIT``, не раздаются, а подмешиваются при чтении
+(fan-out-on-read).
+
+Такой автор отмечается ``UserStats.timeline_pull``, и отметка не
+снимается, когда подписчиков становится меньше: посты, написанные без
+раздачи, есть только в самой таблице постов, и ленты подписчиков
+продолжают читать их напрямую. Снимает отметку только полная
+пересборка лент (``rebuild()``), которая заново раздаёт посты.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from .paginator import DEFAULT_ORDERING
+
+TIMELINE_ORDERING = ('-feed_pub_date', '-feed_post')
+BATCH_SIZE = 500
+
+
+def generation_name(user_id):
+    """Поколение кеша ленты пользователя; меняется при подписке и отписке."""
+    return f'timeline:{user_id}'
+
+
+def is_fanout_author(author_id):
+    """Раздаются ли посты автора подписчикам при записи."""
+    return not UserStats.objects.filter(
+        user_id=author_id, timeline_pull=True
+    ).exists()
+
+
+def mark_pull_author(author_id):
+    """Отмечает автора, если подписчиков стало больше лимита раздачи."""
+    UserStats.objects.filter(
+        user_id=author_id,
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        timeline_pull=False,
+    ).update(timeline_pull=True)
+
+
+def mark_pull_authors():
+    """Отмечает всех авторов, у которых подписчиков больше лимита."""
+    UserStats.objects.filter(
+        followers_count__gt=settings.TIMELINE_FANOUT_LIMIT,
+        timeline_pull=False,
+    ).update(timeline_pull=True)
+
+
+def fan_out_post(post):
+    if not is_fanout_author(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in follower_ids.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out_posts(post_ids):
+    """Раздаёт подписчикам пачку постов, например после импорта."""
+    posts = list(Post.objects.filter(pk__in=post_ids).exclude(
+        author__stats__timeline_pull=True
+    ).values_list('id', 'author_id', 'pub_date'))
+    followers = defaultdict(list)
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in={author_id for _, author_id, _ in posts}
+    ).values_list('author_id', 'user_id').iterator():
+        followers[author_id].append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, author_id, pub_date in posts
+            for user_id in followers[author_id]
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def add_author(user_id, author_id):
+    """Переносит последние посты автора в ленту нового подписчика."""
+    if not is_fanout_author(author_id):
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        *DEFAULT_ORDERING
+    ).values_list('id', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+            for post_id, pub_date in posts
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def pull_authors(user):
+    """Авторы из подписок пользователя, чьи посты читаются напрямую."""
+    return UserStats.objects.filter(
+        user__following__user=user, timeline_pull=True
+    ).values_list('user_id', flat=True)
+
+
+def feed_for(user):
+    """Возвращает посты ленты подписок и порядок для пагинатора."""
+    pull_ids = list(pull_authors(user))
+    if not pull_ids:
+        posts = Post.objects.filter(timeline_entries__user=user).annotate(
+            feed_pub_date=F('timeline_entries__pub_date'),
+            feed_post=F('timeline_entries__post_id'),
+        )
+        return posts, TIMELINE_ORDERING
+    pushed = TimelineEntry.objects.filter(user=user).values('post_id')
+    posts = Post.objects.filter(
+        Q(pk__in=pushed) | Q(author_id__in=pull_ids)
+    )
+    return posts, DEFAULT_ORDERING
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты заданных (или всех) пользователей.
+
+    Полная пересборка заново решает, чьи посты раздаются, по текущему
+    числу подписчиков.
+    """
+    follows = Follow.objects.all()
+    if user_ids is not None:
+        follows = follows.filter(user_id__in=user_ids)
+        TimelineEntry.objects.filter(user_id__in=user_ids).delete()
+    else:
+        TimelineEntry.objects.all().delete()
+        limit = settings.TIMELINE_FANOUT_LIMIT
+        UserStats.objects.filter(followers_count__gt=limit).update(
+            timeline_pull=True
+        )
+        UserStats.objects.filter(followers_count__lte=limit).update(
+            timeline_pull=False
+        )
+    for user_id, author_id in follows.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        add_author(user_id, author_id)
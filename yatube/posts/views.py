@@ -1,57 +1,128 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
-from django.core.paginator import Paginator
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.http import urlencode
+from core.cache import cache_page_by_generation
+from core.query_budget import query_budget
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
+from .paginator import CursorPaginator, DEFAULT_ORDERING
+from . import comment_queue, search, thumbnails, timeline
+from .fragments import FEED_GENERATION
 
+POSTS_PER_PAGE = 10
+# Ленты с карточками делают ещё один запрос: миниатюры всех картинок
+# страницы из KV-хранилища sorl (см. thumbnails.prefetch)
+THUMBNAILS_QUERIES = 1
+COMMENTS_PER_PAGE = 20
+COMMENT_ORDERING = ('-created', '-id')
 
-def paginator_func(post_list, request):
-    paginator = Paginator(post_list, 10)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
 
+def paginator_func(post_list, request, ordering=DEFAULT_ORDERING):
+    paginator = CursorPaginator(
+        post_list,
+        POSTS_PER_PAGE,
+        ordering=ordering,
+        approximate_count=settings.PAGINATOR_APPROXIMATE_COUNT,
+    )
+    return paginator.get_page(
+        request.GET.get('page'),
+        cursor=request.GET.get('cursor'),
+    )
 
-@cache_page(20, key_prefix='index_page')
+
+def index_feed():
+    return Post.objects.select_related('author', 'group')
+
+
+def group_feed(group):
+    return group.posts.select_related('author', 'group')
+
+
+def profile_feed(author):
+    return author.posts.select_related('author', 'group')
+
+
+def follow_feed(user):
+    """Посты ленты подписок и порядок для пагинатора."""
+    post_list, ordering = timeline.feed_for(user)
+    return post_list.select_related('author', 'group'), ordering
+
+
+def comments_page(post, cursor=None):
+    paginator = CursorPaginator(
+        post.comments.select_related('author'),
+        COMMENTS_PER_PAGE,
+        ordering=COMMENT_ORDERING,
+    )
+    if cursor:
+        return paginator.get_page(cursor=cursor)
+    return paginator.first_page()
+
+
+@cache_page_by_generation(FEED_GENERATION, key_prefix='index_page')
+@query_budget(4 + THUMBNAILS_QUERIES)
 def index(request):
     template = 'posts/index.html'
-    post_list = Post.objects.all()
     context = {
-        'page_obj': paginator_func(post_list, request=request)
+        'page_obj': paginator_func(index_feed(), request=request)
     }
     return render(request, template, context)
 
 
+@query_budget(5 + THUMBNAILS_QUERIES)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
     context = {
         'group': group,
-        'page_obj': paginator_func(post_list=posts, request=request)
+        'page_obj': paginator_func(group_feed(group), request=request)
     }
     return render(request, template, context)
 
 
+@query_budget(6 + THUMBNAILS_QUERIES)
 def profile(request, username):
     template_name = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     user = request.user
-    following = user.is_authenticated and author.following.exists()
+    following = user.is_authenticated and Follow.objects.filter(
+        user=user, author=author
+    ).exists()
     context = {
         'author': author,
         'following': following,
-        'page_obj': paginator_func(post_list=posts, request=request),
+        'page_obj': paginator_func(profile_feed(author), request=request),
     }
     return render(request, template_name, context)
 
 
+def post_detail_budget():
+    budget = 4 + THUMBNAILS_QUERIES
+    if settings.COMMENT_WRITE_BEHIND:
+        # Проверка ещё не записанных комментариев автора
+        budget += 1
+    return budget
+
+
+@query_budget(post_detail_budget)
 def post_detail(request, post_id):
     template_name = 'posts/post_detail.html'
     form = CommentForm()
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
+    cursor = request.GET.get('comments')
+    comments = comments_page(post, cursor)
+    if settings.COMMENT_WRITE_BEHIND and not cursor:
+        comments.object_list = comment_queue.pending_comments(
+            post, request.user
+        ) + list(comments.object_list)
     context = {
         'post': post,
         'form': form,
@@ -60,6 +131,50 @@ def post_detail(request, post_id):
     return render(request, template_name, context)
 
 
+@query_budget(4 + THUMBNAILS_QUERIES)
+def post_search(request):
+    template_name = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    posts = search.search(query).select_related('author', 'group')
+    context = {
+        'query': query,
+        'page_query': urlencode({'q': query}) + '&',
+        'page_obj': paginator_func(
+            posts, request=request, ordering=search.SEARCH_ORDERING
+        ),
+    }
+    return render(request, template_name, context)
+
+
+@query_budget(4)
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = comments_page(post, request.GET.get('cursor'))
+    if request.GET.get('format') != 'json':
+        return render(request, 'posts/includes/comments.html', {
+            'post': post,
+            'comments': comments,
+        })
+    next_url = None
+    if comments.next_cursor:
+        next_url = '{}?format=json&cursor={}'.format(
+            reverse('posts:post_comments', args=[post.id]),
+            comments.next_cursor,
+        )
+    return JsonResponse({
+        'comments': [
+            {
+                'id': comment.id,
+                'author': comment.author.username,
+                'text': comment.text,
+                'created': comment.created.isoformat(),
+            }
+            for comment in comments
+        ],
+        'next': next_url,
+    })
+
+
 @login_required
 def post_create(request):
     template_name = 'posts/post_create.html'
@@ -69,6 +184,7 @@ def post_create(request):
         new_post = form.save(commit=False)
         new_post.author = request.user
         new_post.save()
+        thumbnails.schedule(new_post.image.name)
         return redirect('posts:profile', new_post.author)
     contex = {
         'form': form
@@ -88,6 +204,8 @@ def post_edit(request, post_id):
         instance=post)
     if form.is_valid():
         form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post.image.name)
         return redirect('posts:post_detail', post.id)
     context = {
         'form': form,
@@ -105,36 +223,49 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        if settings.COMMENT_WRITE_BEHIND:
+            comment_queue.get_queue().enqueue(comment)
+        else:
+            comment.save()
     return redirect('posts:post_detail', post_id=post_id)
 
 
+# Сессия, пользователь, авторы без раздачи (timeline.pull_authors),
+# COUNT и посты
 @login_required
+@query_budget(5 + THUMBNAILS_QUERIES)
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(
-        author__following__user=request.user,).all()
+    post_list, ordering = follow_feed(request.user)
     context = {
-        'page_obj': paginator_func(post_list, request=request)
+        'page_obj': paginator_func(
+            post_list,
+            request=request,
+            ordering=ordering
+        )
     }
     return render(request, template, context)
 
 
 @login_required
 def profile_follow(request, username):
-    author = User.objects.get(username=username)
+    author = get_object_or_404(User, username=username)
     user = request.user
     if author != user:
-        Follow.objects.get_or_create(user=user, author=author)
+        # Уникальный индекс (user, author) заменяет проверку перед записью
+        try:
+            with transaction.atomic():
+                Follow.objects.create(user=user, author=author)
+        except IntegrityError:
+            pass
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     user = request.user
-    author = User.objects.get(username=username)
-    if author != user:
-        Follow.objects.get(user=user, author=author).delete()
+    author = get_object_or_404(User, username=username)
+    Follow.objects.filter(user=user, author=author).delete()
     return redirect('posts:profile', username=username)
 
 
@@ -32,6 +32,11 @@ ALLOWED_HOSTS = [
     'testserver',
 ]
 
+# Адреса, которым доступна страница /metrics/
+INTERNAL_IPS = [
+    '127.0.0.1',
+]
+
 
 # Application definition
 
@@ -50,6 +55,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.QueryBudgetMiddleware',
+    'core.middleware.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,12 +70,22 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+# Без DEBUG скомпилированные шаблоны хранятся в памяти процесса, а
+# шаблоны из TEMPLATES_DIR компилируются при старте (core.template_backends)
+CACHED_TEMPLATES = not DEBUG
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': (
+                [('django.template.loaders.cached.Loader', TEMPLATE_LOADERS)]
+                if CACHED_TEMPLATES else TEMPLATE_LOADERS
+            ),
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
@@ -88,8 +107,42 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами, а не открывается на каждый
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
     }
 }
+# PRAGMA для каждого нового соединения SQLite (core.sqlite); пустой
+# словарь оставляет настройки SQLite по умолчанию
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Реплики для чтения лент: пути к файлам SQLite через запятую, например
+# DATABASE_REPLICAS=replica.sqlite3 (заполняется командой sync_replica)
+for number, name in enumerate(
+    filter(None, os.getenv('DATABASE_REPLICAS', '').split(',')), start=1
+):
+    DATABASES[f'replica{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name),
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.db_routers.ReplicaRouter']
+REPLICATED_MODELS = (
+    'posts.post',
+    'posts.group',
+    'posts.comment',
+    'posts.follow',
+)
+# Сколько секунд после записи пользователь читает с основной базы; это же
+# верхняя граница отставания реплик для кеша страниц и карточек
+REPLICA_PIN_SECONDS = 5
 
 
 # Password validation
@@ -110,10 +163,40 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Кеш двухуровневый: LRU в памяти процесса перед общим кешем 'shared'.
+# Без CACHE_DIR общий уровень — память процесса (разработка и тесты);
+# с CACHE_DIR это FileBasedCache, общий для всех воркеров машины, а
+# журнал изменений очищает память остальных воркеров при записи.
+# Вместо FileBasedCache подойдёт любой бэкенд, например Redis.
+CACHE_DIR = os.getenv('CACHE_DIR')
 CACHES = {
     'default': {
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'LOCAL_MAX_ENTRIES': 1000,
+            'LOCAL_TIMEOUT': 60,
+            'JOURNAL': CACHE_DIR and os.path.join(
+                CACHE_DIR, 'invalidations.log'
+            ),
+            'PREFIXES': {
+                'generation:': {'local_timeout': 5},
+                'post_card:': {'local_timeout': 600},
+                'index_page:': {'max_size': 256 * 1024},
+                # Блокировки single-flight читаются только из общего кеша
+                'lock:': {'local': False},
+                # Номера ещё не записанных комментариев выдаёт incr
+                'pending_comments:': {'local': False},
+            },
+        },
+    },
+    'shared': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    } if not CACHE_DIR else {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(CACHE_DIR, 'shared'),
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
 
 # Internationalization
@@ -135,6 +218,16 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = os.path.join(BASE_DIR, 'collected_static')
+# Без DEBUG collectstatic добавляет хеш содержимого к именам и сжатые
+# копии .gz/.br, а {% static %} ссылается на хешированные имена
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+# Статику из STATIC_ROOT отдаёт само приложение (core.views.serve_static);
+# хешированные имена кешируются браузером на год, остальные — на минуту
+SERVE_STATIC = not DEBUG
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+STATIC_UNHASHED_MAX_AGE = 60
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
@@ -142,3 +235,74 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Брать число постов в ленте из кеша вместо COUNT(*) на каждый запрос
+PAGINATOR_APPROXIMATE_COUNT = False
+# Посты авторов с большим числом подписчиков не раздаются по лентам
+# при записи, а подмешиваются в ленту при чтении
+TIMELINE_FANOUT_LIMIT = 5000
+# Сколько последних постов автора переносить в ленту при подписке
+TIMELINE_BACKFILL = 1000
+# Превышение бюджета запросов view: исключение (True) или запись в лог;
+# тесты manage.py test всегда запускаются в строгом режиме
+QUERY_BUDGET_STRICT = False
+TEST_RUNNER = 'core.test_runner.StrictQueryBudgetRunner'
+# Сколько хранить в кеше отрисованные карточки постов
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+# Миниатюры строятся заранее пулом потоков, а не во время отрисовки
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+POST_THUMBNAIL_GEOMETRIES = ('860x339', '960x339')
+THUMBNAIL_WORKERS = 2
+# Адаптивные варианты картинок для srcset; AVIF сохраняется, только если
+# его поддерживает установленный Pillow
+POST_IMAGE_WIDTHS = (320, 640, 960)
+POST_IMAGE_FORMATS = ('avif', 'webp')
+POST_IMAGE_RATIO = '960x339'
+POST_IMAGE_QUALITY = 80
+POST_IMAGE_SIZES = '(max-width: 960px) 100vw, 960px'
+
+# Загрузка файлов: всё, что больше FILE_UPLOAD_MAX_MEMORY_SIZE, пишется
+# во временный файл, а приём прекращается после MAX_UPLOAD_SIZE байт.
+# Запрос, который длиннее MAX_UPLOAD_SIZE и MAX_UPLOAD_FORM_SIZE на
+# остальные поля формы, отклоняется до чтения тела
+FILE_UPLOAD_HANDLERS = [
+    'core.uploads.SizeLimitedUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_MAX_MEMORY_SIZE = 1024 * 1024
+MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+MAX_UPLOAD_FORM_SIZE = 64 * 1024
+# Картинки с большим числом пикселей отклоняются, а с большей стороной
+# больше POST_IMAGE_MAX_SIDE — уменьшаются при перекодировании
+POST_IMAGE_MAX_PIXELS = 40 * 1000 * 1000
+POST_IMAGE_MAX_SIDE = 2560
+# Поиск по постам: 'fts5', 'inverted' (обратный индекс в таблице) или
+# 'auto' — FTS5, если миграция смогла создать его таблицу
+SEARCH_BACKEND = 'auto'
+# Размер пула потоков, в котором ASGI-обработчик выполняет запросы
+ASGI_THREADS = 8
+# Перестроение страницы при промахе кеша: блокировка не дольше
+# SINGLE_FLIGHT_LOCK_TIMEOUT секунд, а без устаревшей копии остальные
+# запросы ждут готовую страницу до SINGLE_FLIGHT_WAIT секунд
+SINGLE_FLIGHT_LOCK_TIMEOUT = 10
+SINGLE_FLIGHT_WAIT = 2
+# Сколько хранятся страницы лент: текущего поколения и последняя
+# построенная версия, которую отдают во время перестроения
+PAGE_CACHE_TIMEOUT = 60 * 10
+PAGE_CACHE_STALE_TIMEOUT = 60 * 60
+# Отложенная запись комментариев (posts.comment_queue): пачкой раз в
+# COMMENT_FLUSH_INTERVAL секунд или по COMMENT_FLUSH_SIZE штук, с
+# журналом в COMMENT_SPOOL_DIR на случай падения процесса
+COMMENT_WRITE_BEHIND = False
+COMMENT_FLUSH_INTERVAL = 0.2
+COMMENT_FLUSH_SIZE = 100
+COMMENT_SPOOL_DIR = os.path.join(BASE_DIR, 'spool', 'comments')
+# Доля запросов, для которых PerformanceMiddleware замеряет SQL, кеш и
+# шаблоны; время ответа пишется для всех запросов
+PERFORMANCE_SAMPLE_RATE = 0.05
+# Отдавать замеры в заголовке Server-Timing (только замеренным запросам)
+SERVER_TIMING = True
+# Сжатие ответов CompressionMiddleware: только эти типы и только не
+# короче COMPRESSION_MIN_SIZE байт (меньшие почти не сжимаются)
+COMPRESSION_CONTENT_TYPES = ('text/html', 'application/json')
+COMPRESSION_MIN_SIZE = 1024
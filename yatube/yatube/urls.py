@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.contrib import admin
-from django.urls import include, path
+from django.urls import include, path, re_path
+
+from core.views import metrics, serve_static
 
 urlpatterns = [
     path('', include('posts.urls')),
@@ -7,7 +10,16 @@ urlpatterns = [
     path('auth/', include('users.urls')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
-    path('post/', include('posts.urls', namespace='posts'))
+    path('post/', include('posts.urls', namespace='posts')),
+    path('metrics/', metrics, name='metrics'),
 ]
 
+if settings.SERVE_STATIC:
+    urlpatterns += [
+        re_path(
+            r'^{}(?P<path>.+)$'.format(settings.STATIC_URL.lstrip('/')),
+            serve_static,
+        ),
+    ]
+
 handler404 = 'core.views.page_not_found'
\ No newline at end of file